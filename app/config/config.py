@@ -23,6 +23,52 @@ class Settings(BaseSettings):
 
     database_pool_size: int = 50
     database_max_overflow: int = 85
+    # compiled SQL kept per engine, and prepared statements per asyncpg connection
+    database_query_cache_size: int = 1200
+    database_prepared_statement_cache_size: int = 500
+    # filter shapes whose expression trees CrudUtil keeps
+    statement_cache_size: int = 512
+    # list routes serialize with pydantic-core and skip FastAPI's second validation
+    fast_json_responses: bool = False
+
+    # in-process read cache for catalog lookups
+    cache_enabled: bool = False
+    cache_max_entries: int = 1024
+    cache_ttl_seconds: float = 30.0
+
+    # order reservations
+    reservation_ttl_seconds: int = 300
+    reservation_sweep_interval_seconds: int = 30
+
+    # order intake queue, 0 workers leaves draining to other processes
+    order_worker_count: int = 4
+    order_worker_poll_interval_seconds: float = 1.0
+    order_coalesce_enabled: bool = False
+    order_coalesce_window_ms: float = 5.0
+    order_coalesce_max_batch: int = 64
+    # buffered order logs are written after the order commits and can be
+    # lost on a crash; inline keeps them in the order transaction
+    order_log_buffered: bool = False
+    order_log_batch_size: int = 500
+    order_log_flush_interval_seconds: float = 0.5
+    order_log_max_buffered: int = 50000
+    order_log_synchronous_commit: bool = True
+    product_import_chunk_size: int = 5000
+
+    # payment provider, "fake" runs offline and "http" calls payment_gateway_url
+    payment_gateway: str = "fake"
+    payment_gateway_url: str = ""
+    payment_max_concurrency: int = 100
+    payment_max_retries: int = 3
+    payment_attempt_timeout_seconds: float = 5.0
+    payment_backoff_base_seconds: float = 0.5
+    payment_backoff_cap_seconds: float = 8.0
+    payment_deadline_seconds: float = 15.0
+    payment_breaker_failure_threshold: int = 5
+    payment_breaker_reset_seconds: float = 30.0
+    payment_fake_latency_seconds: float = 1.0
+    payment_fake_failure_rate: float = 0.0
+    payment_fake_decline_rate: float = 0.0
 
     model_config = SettingsConfigDict(
         env_file=(".env"),
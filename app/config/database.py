@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config.config import settings
@@ -6,15 +8,42 @@ from app.config.config import settings
 # use local environment
 engine_url = settings.database_private_url
 
+# same database, served through the asyncpg driver for the async routes;
+# asyncpg prepares statements server side and keeps them per connection, so
+# repeated query shapes also skip Postgres planning (0 turns this off, as
+# needed behind a transaction pooling pgbouncer)
+async_engine_url = make_url(engine_url).set(
+    drivername="postgresql+asyncpg"
+).update_query_dict({
+    "prepared_statement_cache_size": str(settings.database_prepared_statement_cache_size)
+})
+
 
 engine = create_engine(
     engine_url,
     pool_size=settings.database_pool_size,
     max_overflow=settings.database_max_overflow,
+    query_cache_size=settings.database_query_cache_size,
+)
+
+async_engine = create_async_engine(
+    async_engine_url,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    query_cache_size=settings.database_query_cache_size,
 )
 
 
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit is off so committed objects can still be serialized
+# without triggering an implicit (blocking) refresh; eager_defaults on the
+# models fills the server generated columns at flush time
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
@@ -1,11 +1,40 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config.config import settings
+from app.payment.gateway import close_payment_client
+from app.product import cruds as product_cruds
 from app.product import router as product_router
+from app.product.log_sink import order_log_sink
+from app.product import tasks as product_tasks
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    background_tasks = [asyncio.create_task(product_tasks.reservation_sweeper())]
+    background_tasks.extend(
+        asyncio.create_task(product_tasks.order_worker())
+        for _ in range(settings.order_worker_count)
+    )
+    if settings.order_log_buffered:
+        background_tasks.append(asyncio.create_task(order_log_sink.run()))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    # groups still waiting for their window hold callers, flush them before exit
+    await product_cruds.order_coalescer.drain()
+    # after the coalescer, its orders log through the sink too
+    await order_log_sink.close()
+    await close_payment_client()
+
 
 app = FastAPI(
-    title="Lorcan Bet Async"
+    title="Lorcan Bet Async",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -20,4 +49,5 @@ app.include_router(product_router.category_router)
 app.include_router(product_router.product_router)
 app.include_router(product_router.inventory_router)
 app.include_router(product_router.order_router)
-app.include_router(product_router.order_log_router)
\ No newline at end of file
+app.include_router(product_router.order_log_router)
+app.include_router(product_router.cache_router)
@@ -0,0 +1,46 @@
+"""create reservations
+
+Revision ID: 3f1c9a7d2b64
+Revises: 686801013014
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b64'
+down_revision = '686801013014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('reservations',
+    sa.Column('product_id', sa.String(length=50), nullable=False),
+    sa.Column('order_id', sa.String(length=50), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('held', 'confirmed', 'released', name='reservationstatus'), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('uuid', sa.String(length=50), nullable=False),
+    sa.Column('date', sa.Date(), server_default=sa.text('CURRENT_DATE'), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_modified', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.uuid'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.uuid'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('uuid')
+    )
+    op.create_index(op.f('ix_reservations_created_at'), 'reservations', ['created_at'], unique=False)
+    op.create_index(op.f('ix_reservations_date'), 'reservations', ['date'], unique=False)
+    op.create_index(op.f('ix_reservations_expires_at'), 'reservations', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_reservations_expires_at'), table_name='reservations')
+    op.drop_index(op.f('ix_reservations_date'), table_name='reservations')
+    op.drop_index(op.f('ix_reservations_created_at'), table_name='reservations')
+    op.drop_table('reservations')
+    sa.Enum(name='reservationstatus').drop(op.get_bind(), checkfirst=True)
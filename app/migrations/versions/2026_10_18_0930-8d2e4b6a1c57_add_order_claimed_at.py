@@ -0,0 +1,34 @@
+"""add order claimed_at
+
+Revision ID: 8d2e4b6a1c57
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e4b6a1c57'
+down_revision = '3f1c9a7d2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('orders', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    # existing orders were all processed inline, keep them out of the queue
+    op.execute("UPDATE orders SET claimed_at = last_modified")
+    op.create_index(
+        'ix_orders_queue',
+        'orders',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending' AND claimed_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_queue', table_name='orders')
+    op.drop_column('orders', 'claimed_at')
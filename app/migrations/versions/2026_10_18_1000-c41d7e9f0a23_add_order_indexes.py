@@ -0,0 +1,42 @@
+"""add order indexes
+
+Revision ID: c41d7e9f0a23
+Revises: 8d2e4b6a1c57
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d7e9f0a23'
+down_revision = '8d2e4b6a1c57'
+branch_labels = None
+depends_on = None
+
+
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction, so every
+# statement runs in an autocommit block and does not block writes
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_inventories_product_id', 'inventories', ['product_id'], unique=True, postgresql_concurrently=True)
+        op.create_index('ix_orders_product_id_status_date', 'orders', ['product_id', 'status', 'date'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_orders_status_date', 'orders', ['status', 'date'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_orders_pending', 'orders', ['created_at'], unique=False, postgresql_where=sa.text("status = 'pending'"), postgresql_concurrently=True)
+        op.create_index('ix_orderlogs_order_id_processed_at', 'orderlogs', ['order_id', 'processed_at'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_orderlogs_processed_at', 'orderlogs', ['processed_at'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_reservations_order_id', 'reservations', ['order_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_reservations_held', 'reservations', ['expires_at'], unique=False, postgresql_where=sa.text("status = 'held'"), postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reservations_held', table_name='reservations', postgresql_concurrently=True)
+        op.drop_index('ix_reservations_order_id', table_name='reservations', postgresql_concurrently=True)
+        op.drop_index('ix_orderlogs_processed_at', table_name='orderlogs', postgresql_concurrently=True)
+        op.drop_index('ix_orderlogs_order_id_processed_at', table_name='orderlogs', postgresql_concurrently=True)
+        op.drop_index('ix_orders_pending', table_name='orders', postgresql_concurrently=True)
+        op.drop_index('ix_orders_status_date', table_name='orders', postgresql_concurrently=True)
+        op.drop_index('ix_orders_product_id_status_date', table_name='orders', postgresql_concurrently=True)
+        op.drop_index('ix_inventories_product_id', table_name='inventories', postgresql_concurrently=True)
@@ -0,0 +1,41 @@
+"""add inventory buckets
+
+Revision ID: 5b8e2f4c7d19
+Revises: c41d7e9f0a23
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2f4c7d19'
+down_revision = 'c41d7e9f0a23'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # every existing inventory row becomes bucket 0 of its product
+    op.add_column('inventories', sa.Column('bucket', sa.Integer(), server_default='0', nullable=False))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_inventories_product_id_bucket', 'inventories', ['product_id', 'bucket'], unique=True, postgresql_concurrently=True)
+        op.drop_index('ix_inventories_product_id', table_name='inventories', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    # fold the buckets back into bucket 0 before the one-row-per-product index returns
+    op.execute(
+        "UPDATE inventories SET quantity = totals.quantity "
+        "FROM (SELECT product_id, SUM(quantity) AS quantity FROM inventories GROUP BY product_id) AS totals "
+        "WHERE inventories.product_id = totals.product_id AND inventories.bucket = 0"
+    )
+    op.execute("DELETE FROM inventories WHERE bucket <> 0")
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_inventories_product_id', 'inventories', ['product_id'], unique=True, postgresql_concurrently=True)
+        op.drop_index('ix_inventories_product_id_bucket', table_name='inventories', postgresql_concurrently=True)
+
+    op.drop_column('inventories', 'bucket')
@@ -0,0 +1,34 @@
+"""add product catalog indexes
+
+Revision ID: 9a4c6e1f3b82
+Revises: 5b8e2f4c7d19
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c6e1f3b82'
+down_revision = '5b8e2f4c7d19'
+branch_labels = None
+depends_on = None
+
+
+# CREATE INDEX CONCURRENTLY cannot run inside a transaction, so every
+# statement runs in an autocommit block and does not block writes
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_price_id', 'products', ['price', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_products_created_at_id', 'products', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_products_name_lower_pattern', 'products', [sa.func.lower(sa.column('name')).label('name_lower')], unique=False, postgresql_ops={'name_lower': 'text_pattern_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_product_category_category_id_product_id', 'product_category', ['category_id', 'product_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_product_category_category_id_product_id', table_name='product_category', postgresql_concurrently=True)
+        op.drop_index('ix_products_name_lower_pattern', table_name='products', postgresql_concurrently=True)
+        op.drop_index('ix_products_created_at_id', table_name='products', postgresql_concurrently=True)
+        op.drop_index('ix_products_price_id', table_name='products', postgresql_concurrently=True)
@@ -30,6 +30,10 @@ class BaseMixin:
         plural_name: str = get_plural.plural_noun(cls.__name__.lower())
         return plural_name
 
+    # server generated columns come back through INSERT/UPDATE ... RETURNING,
+    # so a written object never needs a refresh SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
     id = Column(Integer, primary_key=True, nullable=False, autoincrement=True)
     uuid = Column(String(length=50), unique=True, nullable=False, default=get_new_ulid)
     date = Column(
@@ -9,7 +9,9 @@ class OrderStatusEnum(str, Enum):
 
 
 class ListBase(BaseModel):
-    count: int
+    # None when the caller opted out of counting
+    count: int | None
+    next_cursor: str | None = None
 
 
 class FilterBase(BaseModel):
@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+
+import httpx
+
+from app.config.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentError(Exception):
+    """The provider could not be reached or failed to answer"""
+
+
+class PaymentGateway(ABC):
+    """
+    A payment provider. charge returns True when the payment went through,
+    False when it was declined, and raises PaymentError when the provider
+    itself is failing.
+    """
+
+    @abstractmethod
+    async def charge(self, reference: str) -> bool:
+        ...
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HttpPaymentGateway(PaymentGateway):
+    """Talks to the provider over one pooled HTTP client"""
+
+    def __init__(self, base_url: str, timeout: float, max_connections: int):
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    async def charge(self, reference: str) -> bool:
+        try:
+            # the reference doubles as idempotency key, retries never charge twice
+            response = await self.client.post(
+                "/charges",
+                json={"reference": reference},
+                headers={"Idempotency-Key": reference},
+            )
+        except httpx.HTTPError as e:
+            raise PaymentError(f"Payment provider unreachable: {e}") from e
+
+        if response.status_code >= 500:
+            raise PaymentError(f"Payment provider error {response.status_code}")
+
+        return response.is_success
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class FakePaymentGateway(PaymentGateway):
+    """Offline stand-in for the provider with configurable latency and failures"""
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        failure_rate: float = 0.0,
+        decline_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self.random = random.Random(seed)
+
+    async def charge(self, reference: str) -> bool:
+        await asyncio.sleep(self.latency)
+
+        if self.random.random() < self.failure_rate:
+            raise PaymentError("Simulated payment provider failure")
+
+        return self.random.random() >= self.decline_rate
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive provider failures. While open
+    every call fails fast; after reset_timeout a single trial call is let
+    through and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return False
+
+        # half-open, only one caller gets to probe the provider
+        if self.trial_in_flight:
+            return False
+
+        self.trial_in_flight = True
+        return True
+
+    def release_trial(self) -> None:
+        # the trial ended without an answer, the next caller may probe instead
+        self.trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial_in_flight = False
+
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class PaymentClient:
+    """
+    Wraps a PaymentGateway with a bound on in-flight charges, full-jitter
+    exponential backoff within an overall deadline, and a circuit breaker.
+    """
+
+    def __init__(
+        self,
+        gateway: PaymentGateway,
+        max_concurrency: int = 100,
+        max_retries: int = 3,
+        attempt_timeout: float = 5.0,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0,
+        deadline: float = 15.0,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.gateway = gateway
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.attempt_timeout = attempt_timeout
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+
+    async def pay(self, reference: str) -> bool:
+        deadline = time.monotonic() + self.deadline
+
+        for attempt in range(1, self.max_retries + 1):
+            # a call let through an open breaker is its half-open trial
+            trial = self.breaker.is_open
+            if not self.breaker.allow():
+                logger.warning("Payment circuit open, failing %s fast", reference)
+                return False
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            logger.debug("Attempting payment %s, try %s of %s", reference, attempt, self.max_retries)
+            try:
+                async with self.semaphore:
+                    success = await asyncio.wait_for(
+                        self.gateway.charge(reference),
+                        timeout=min(self.attempt_timeout, remaining),
+                    )
+            except (PaymentError, asyncio.TimeoutError) as e:
+                logger.warning("Payment %s attempt %s failed: %r", reference, attempt, e)
+                self.breaker.record_failure()
+            except asyncio.CancelledError:
+                # a disconnect or shutdown says nothing about the provider
+                if trial:
+                    self.breaker.release_trial()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            else:
+                # a decline still means the provider is healthy, and is final
+                self.breaker.record_success()
+                if not success:
+                    logger.info("Payment %s declined", reference)
+                return success
+
+            if attempt == self.max_retries:
+                break
+
+            # full jitter keeps retries of concurrent orders from lining up
+            delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                break
+
+            await asyncio.sleep(delay)
+
+        logger.warning("Payment %s failed after retries", reference)
+        return False
+
+    async def aclose(self) -> None:
+        await self.gateway.aclose()
+
+
+_payment_client: PaymentClient | None = None
+
+
+def build_payment_gateway() -> PaymentGateway:
+    if settings.payment_gateway == "http":
+        return HttpPaymentGateway(
+            base_url=settings.payment_gateway_url,
+            timeout=settings.payment_attempt_timeout_seconds,
+            max_connections=settings.payment_max_concurrency,
+        )
+
+    return FakePaymentGateway(
+        latency=settings.payment_fake_latency_seconds,
+        failure_rate=settings.payment_fake_failure_rate,
+        decline_rate=settings.payment_fake_decline_rate,
+    )
+
+
+def get_payment_client() -> PaymentClient:
+    global _payment_client
+
+    if _payment_client is None:
+        _payment_client = PaymentClient(
+            gateway=build_payment_gateway(),
+            max_concurrency=settings.payment_max_concurrency,
+            max_retries=settings.payment_max_retries,
+            attempt_timeout=settings.payment_attempt_timeout_seconds,
+            backoff_base=settings.payment_backoff_base_seconds,
+            backoff_cap=settings.payment_backoff_cap_seconds,
+            deadline=settings.payment_deadline_seconds,
+            breaker=CircuitBreaker(
+                failure_threshold=settings.payment_breaker_failure_threshold,
+                reset_timeout=settings.payment_breaker_reset_seconds,
+            ),
+        )
+
+    return _payment_client
+
+
+async def close_payment_client() -> None:
+    global _payment_client
+
+    if _payment_client is not None:
+        await _payment_client.aclose()
+        _payment_client = None
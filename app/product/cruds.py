@@ -1,12 +1,35 @@
-from typing import Any
+import csv
+import io
+import json
+import logging
+from typing import Any, AsyncIterator, BinaryIO
+import psycopg2
 from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import exists, func, insert, select, update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, selectinload
 
-from app.config.database import SessionLocal
+from app.config.config import settings
+from app.config.database import AsyncSessionLocal
 from app.utils.crud_util import CrudUtil
+from app.utils.async_crud_util import AsyncCrudUtil
+from app.utils.cache_util import invalidate_on_commit, read_cache
+from app.utils.coalescer import Coalescer
+from app.utils.etag_util import make_etag
+from app.utils.response_util import sparse_list_schema, type_adapter
+from app.utils.import_util import copy_rows, read_import_chunks
+from app.mixins.columns import get_new_ulid
+from app.mixins.commons import DateRange, OrderStatusEnum
+from app.utils.enums import CountStrategy, ExportFormat, ProductSort, SortOrder
+from app.utils.pagination import decode_cursor, keyset_condition, next_cursor
+from app.payment.gateway import get_payment_client
 from app.product import models, schemas
-import asyncio
-from datetime import datetime
+from app.product.log_sink import add_order_log
+from datetime import date, datetime, timedelta
+
+logger = logging.getLogger(__name__)
 
 
 # Create a new category
@@ -24,12 +47,38 @@ def create_category(
 
 
 # List categories
-def list_category(cu: CrudUtil, skip: int, limit: int) -> schemas.CategoryList:
-    roles: dict[str, Any] = cu.list_model(
-        model_to_list=models.Category,
-        skip=skip,
-        limit=limit
-    )
+def list_category(
+    cu: CrudUtil,
+    skip: int,
+    limit: int,
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    fields: tuple[str, ...] | None = None
+) -> schemas.CategoryList:
+    if fields and "products" not in fields:
+        # Without products the page is a plain column projection
+        roles: dict[str, Any] = cu.list_model(
+            model_to_list=models.Category,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            count_strategy=count_strategy,
+            columns=list(fields)
+        )
+    else:
+        # Products are serialized with every category, fetch them in one extra query
+        roles = cu.list_model(
+            model_to_list=models.Category,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            count_strategy=count_strategy,
+            load_options=[selectinload(models.Category.products)]
+        )
+
+    if fields:
+        sparse_list: type[schemas.CategoryList] = sparse_list_schema(schemas.CategoryList, fields)
+        return sparse_list(**roles)
 
     return schemas.CategoryList(**roles)
 
@@ -42,26 +91,33 @@ def get_category_by_uuid(
 
     category: models.Category = cu.get_model_or_404(
         model_to_get=models.Category,
-        model_conditions={"uuid": uuid}
+        model_conditions={"uuid": uuid},
+        load_options=[selectinload(models.Category.products)]
     )
     return category
 
 
+# Changes with the category itself and with any of its products
+def get_category_etag(category: models.Category) -> str:
+    return make_etag(
+        category.uuid,
+        category.last_modified,
+        *(f"{product.uuid}:{product.last_modified}" for product in category.products)
+    )
+
+
 # Update category by UUID
 def update_category (
     cu: CrudUtil,
     uuid: str,
     update_data: schemas.CategoryUpdate,
 ) -> models.Category:
-    category: models.Category = cu.update_model(
-        model_to_update=models.Category,
-        update=update_data,
-        update_conditions={"uuid": uuid},
-        autocommit=True,
-    )
-
-    cu.db.commit()
-    cu.db.refresh(category)
+    with cu.unit_of_work():
+        category: models.Category = cu.update_model(
+            model_to_update=models.Category,
+            update=update_data,
+            update_conditions={"uuid": uuid},
+        )
 
     return category
 
@@ -81,37 +137,154 @@ def create_product(
     cu: CrudUtil,
     product_data: schemas.ProductCreate
 ) -> models.Product:
-    # Step 1: First, create the product (without initial_quantity)
-    product: models.Product = cu.create_model(
-        model_to_create=models.Product,
-        create=product_data,
-    )
+    # All three steps commit together, a missing category leaves no orphan product
+    with cu.unit_of_work():
+        # Step 1: First, create the product (without initial_quantity)
+        product: models.Product = cu.create_model(
+            model_to_create=models.Product,
+            create=product_data,
+        )
 
-    # Now associate the product with the category
-    add_product_to_category(
-        cu=cu,
-        product_uuid=product.uuid,
-        category_uuid=product_data.category_uuid,
-    )
+        # Now associate the product with the category
+        add_product_to_category(
+            cu=cu,
+            product_uuid=product.uuid,
+            category_uuid=product_data.category_uuid,
+        )
 
-    # Step 3: Initialize the inventory for the product
-    initialize_inventory(
-        cu=cu,
-        product_uuid=product.uuid,
-        initial_quantity=product_data.initial_quantity,
-    )
+        # Step 3: Initialize the inventory for the product
+        initialize_inventory(
+            cu=cu,
+            product_uuid=product.uuid,
+            initial_quantity=product_data.initial_quantity,
+        )
 
     return product
 
 
+# Bulk catalog import, one transaction per chunk; bad rows are reported and skipped
+def import_products(
+    cu: CrudUtil,
+    file: BinaryIO,
+    filename: str | None,
+    chunk_size: int
+) -> schemas.ProductImportResult:
+    result = schemas.ProductImportResult()
+
+    for chunk in read_import_chunks(file, filename, chunk_size):
+        valid: list[tuple[int, schemas.ProductCreate]] = []
+        for row_number, row in chunk:
+            try:
+                valid.append((row_number, schemas.ProductCreate.model_validate(row)))
+            except ValidationError as e:
+                result.errors.append(schemas.ProductImportError(
+                    row=row_number,
+                    detail="; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()
+                    )
+                ))
+
+        # One query resolves every category referenced by the chunk
+        category_uuids = {product_data.category_uuid for _, product_data in valid}
+        known_categories = set(cu.db.scalars(
+            select(models.Category.uuid).where(models.Category.uuid.in_(category_uuids))
+        )) if category_uuids else set()
+
+        rows: list[tuple[int, str, schemas.ProductCreate]] = []
+        for row_number, product_data in valid:
+            if product_data.category_uuid not in known_categories:
+                result.errors.append(schemas.ProductImportError(
+                    row=row_number, detail="Category not found"
+                ))
+                continue
+            rows.append((row_number, get_new_ulid(), product_data))
+
+        if not rows:
+            continue
+
+        try:
+            copy_rows(
+                cu.db,
+                models.Product.__table__,
+                ["uuid", "name", "description", "price"],
+                [
+                    (uuid, product_data.name, product_data.description, product_data.price)
+                    for _, uuid, product_data in rows
+                ]
+            )
+            cu.db.execute(insert(models.product_category), [
+                {"product_id": uuid, "category_id": product_data.category_uuid}
+                for _, uuid, product_data in rows
+            ])
+            cu.db.execute(insert(models.Inventory), [
+                {"product_id": uuid, "quantity": product_data.initial_quantity}
+                for _, uuid, product_data in rows
+            ])
+            cu.db.commit()
+        # COPY goes straight to psycopg2, its errors are not wrapped by SQLAlchemy
+        except (SQLAlchemyError, psycopg2.Error) as e:
+            cu.db.rollback()
+            result.errors.extend(
+                schemas.ProductImportError(row=row_number, detail=f"Chunk rejected by the database: {e}")
+                for row_number, _, _ in rows
+            )
+            continue
+
+        result.imported += len(rows)
+
+    result.failed = len(result.errors)
+
+    read_cache.invalidate(models.Product)
+    read_cache.invalidate(models.Category)
+    read_cache.invalidate(models.product_category)
+    read_cache.invalidate(models.Inventory)
+
+    return result
+
+
 # List products
-def list_products(cu: CrudUtil, skip: int, limit: int) -> schemas.ProductList:
+def list_products(
+    cu: CrudUtil,
+    skip: int,
+    limit: int,
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    fields: tuple[str, ...] | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    category_uuid: str | None = None,
+    name_prefix: str | None = None,
+    sort: ProductSort = ProductSort.id,
+    order: SortOrder = SortOrder.asc
+) -> schemas.ProductList:
+    # The category filter goes through the association table only when asked
+    # for, an unfiltered join would repeat products linked to several categories
+    join_conditions: dict[Any, Any] = {}
+    if category_uuid:
+        join_conditions[models.product_category] = {"category_id": category_uuid}
+
+    # Only the columns the response needs are selected, as plain rows
     products: dict[str, Any] = cu.list_model(
         model_to_list=models.Product,
+        list_conditions={
+            "price__gte": min_price,
+            "price__lte": max_price,
+            "name__prefix": name_prefix,
+        },
+        join_conditions=join_conditions,
         skip=skip,
-        limit=limit
+        limit=limit,
+        order_by_column=sort.value,
+        order=order.value,
+        cursor=cursor,
+        count_strategy=count_strategy,
+        columns=list(fields or schemas.ProductSchema.model_fields)
     )
 
+    if fields:
+        sparse_list: type[schemas.ProductList] = sparse_list_schema(schemas.ProductList, fields)
+        return sparse_list(**products)
+
     return schemas.ProductList(**products)
 
 
@@ -135,15 +308,12 @@ def update_product(
     uuid: str,
     update_data: schemas.ProductUpdate,
 ) -> models.Product:
-    product: models.Product = cu.update_model(
-        model_to_update=models.Product,
-        update=update_data,
-        update_conditions={"uuid": uuid},
-        autocommit=True,
-    )
-
-    cu.db.commit()
-    cu.db.refresh(product)
+    with cu.unit_of_work():
+        product: models.Product = cu.update_model(
+            model_to_update=models.Product,
+            update=update_data,
+            update_conditions={"uuid": uuid},
+        )
 
     return product
 
@@ -175,12 +345,20 @@ def add_product_to_category(
         model_conditions={"uuid": category_uuid}
     )
 
-    # Add the product to the category's product list
-    category.products.append(product)
+    with cu.unit_of_work():
+        # Insert the link row directly, appending to category.products would
+        # load every product of the category first
+        cu.db.execute(
+            insert(models.product_category).values(
+                product_id=product.uuid,
+                category_id=category.uuid
+            )
+        )
+        cu.db.expire(category, ["products"])
 
-    # Commit the transaction to save changes
-    cu.db.commit()
-    cu.db.refresh(category)
+        # an outer unit of work may commit later than this block
+        invalidate_on_commit(cu.db, models.Category)
+        invalidate_on_commit(cu.db, models.product_category)
 
     return category
 
@@ -198,140 +376,794 @@ def initialize_inventory(cu: CrudUtil, product_uuid: str, initial_quantity: int)
     )
 
 
-# The function to retrieve all inventories
+# The function to retrieve all inventories, one entry per product with its buckets summed
 def get_inventory_list(
     cu: CrudUtil,
     skip: int,
-    limit: int
-) -> schemas.InventoryList:
-    inventories_query = cu.db.query(models.Inventory).offset(skip).limit(limit).all()
-    inventory_list = [
-        schemas.InventorySchema(
-            product_id=inventory.product_id,
-            quantity=inventory.quantity
+    limit: int,
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact
+) -> list[schemas.InventorySchema] | schemas.InventoryList:
+    querier = (
+        cu.db.query(
+            models.Inventory.product_id,
+            func.sum(models.Inventory.quantity).label("quantity"),
+            func.min(models.Inventory.id).label("id")
         )
-        for inventory in inventories_query
-    ]
+        .group_by(models.Inventory.product_id)
+        .order_by(models.Inventory.product_id)
+    )
+
+    if cursor is None:
+        inventories_query = querier.offset(skip).limit(limit).all()
+
+        # One validation call for the page instead of a constructor per row
+        return type_adapter(list[schemas.InventorySchema]).validate_python(
+            inventories_query, from_attributes=True
+        )
+
+    # Cursor pages come back as a list object carrying the next cursor
+    if cursor:
+        product_id, _ = decode_cursor(models.Inventory, "product_id", cursor)
+        querier = querier.filter(models.Inventory.product_id > product_id)
+    inventories = querier.limit(limit).all()
+
+    # exact_window uses the exact count here, the page query is grouped
+    count: int | None = None
+    if count_strategy == CountStrategy.estimated:
+        count = cu.get_model_count_estimate(models.Inventory)
+    if count is None and count_strategy != CountStrategy.none:
+        count = cu.db.query(
+            func.count(func.distinct(models.Inventory.product_id))
+        ).scalar()
+
+    return schemas.InventoryList(
+        count=count,
+        items=inventories,
+        next_cursor=next_cursor(inventories, limit, "product_id")
+    )
+
+
+# Split a product's stock evenly across N bucket rows, N=1 folds it back into one row
+def shard_inventory(
+    cu: CrudUtil,
+    product_uuid: str,
+    shard_data: schemas.InventoryShardCreate
+) -> schemas.InventoryShardSchema:
+    if shard_data.buckets < 1:
+        raise HTTPException(status_code=400, detail="A product needs at least one bucket")
+
+    buckets = (
+        cu.db.query(models.Inventory)
+        .filter(models.Inventory.product_id == product_uuid)
+        .order_by(models.Inventory.bucket)
+        .with_for_update()
+        .all()
+    )
+
+    if not buckets:
+        raise HTTPException(status_code=404, detail="Inventory not found")
+
+    total = sum(bucket.quantity for bucket in buckets)
+    share, remainder = divmod(total, shard_data.buckets)
+
+    existing = {bucket.bucket: bucket for bucket in buckets}
+    for number in range(shard_data.buckets):
+        quantity = share + (1 if number < remainder else 0)
+        if number in existing:
+            existing.pop(number).quantity = quantity
+        else:
+            cu.db.add(models.Inventory(
+                product_id=product_uuid,
+                bucket=number,
+                quantity=quantity
+            ))
+
+    # Buckets past the new count had their stock folded into the total above
+    for bucket in existing.values():
+        cu.db.delete(bucket)
+
+    cu.db.commit()
+    read_cache.invalidate(models.Inventory)
+
+    return schemas.InventoryShardSchema(
+        product_id=product_uuid,
+        quantity=total,
+        buckets=shard_data.buckets
+    )
+
+
+# Any insert, update or delete moves either the latest last_modified or the count
+def get_inventory_etag(
+    cu: CrudUtil,
+    skip: int,
+    limit: int,
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact
+) -> str:
+    last_modified, count = cu.db.query(
+        func.max(models.Inventory.last_modified),
+        func.count(models.Inventory.id)
+    ).one()
+
+    return make_etag(
+        models.Inventory.__tablename__,
+        last_modified,
+        count,
+        skip,
+        limit,
+        cursor,
+        count_strategy.value
+    )
+
+
+# Check and take stock with conditional UPDATEs, the caller owns the transaction
+async def decrement_inventory(db: AsyncSession, product_uuid: str, quantity: int) -> int:
+    remaining, buckets = await decrement_single_bucket(db, product_uuid, quantity)
+
+    if buckets > 1:
+        # Sharded: a random bucket nobody holds, else wait for one that covers it
+        remaining = await decrement_one_bucket(db, product_uuid, quantity, skip_locked=True)
+        if remaining is None:
+            remaining = await decrement_one_bucket(db, product_uuid, quantity, skip_locked=False)
+
+        # Only when no single bucket holds enough is the stock gathered from several
+        if remaining is None:
+            remaining = await decrement_inventory_buckets(db, product_uuid, quantity)
+
+    if remaining is None:
+        raise HTTPException(status_code=400, detail="Insufficient stock")
+
+    invalidate_on_commit(db, models.Inventory)
+
+    return remaining
+
+
+# The plain conditional UPDATE for an unsharded product, in the same statement as
+# its bucket count; a sharded product is left untouched and only counted
+async def decrement_single_bucket(
+    db: AsyncSession, product_uuid: str, quantity: int
+) -> tuple[int | None, int]:
+    other_buckets = aliased(models.Inventory)
+
+    taken = (
+        update(models.Inventory)
+        .where(
+            models.Inventory.product_id == product_uuid,
+            models.Inventory.bucket == 0,
+            models.Inventory.quantity >= quantity,
+            ~exists().where(
+                other_buckets.product_id == product_uuid,
+                other_buckets.bucket != 0
+            )
+        )
+        .values(quantity=models.Inventory.quantity - quantity)
+        .returning(models.Inventory.quantity)
+        .cte("taken")
+    )
+
+    # Postgres runs the UPDATE in the WITH clause whether or not its rows are read
+    result = await db.execute(select(
+        select(taken.c.quantity).scalar_subquery(),
+        select(func.count(models.Inventory.id))
+        .where(models.Inventory.product_id == product_uuid)
+        .scalar_subquery()
+    ))
+    remaining, buckets = result.one()
+
+    return remaining, buckets
+
+
+# Take the whole quantity from one bucket of a sharded product. skip_locked picks a
+# random free bucket; otherwise the UPDATE waits for the row and checks it again
+async def decrement_one_bucket(
+    db: AsyncSession, product_uuid: str, quantity: int, skip_locked: bool
+) -> int | None:
+    bucket_id = (
+        select(models.Inventory.id)
+        .where(
+            models.Inventory.product_id == product_uuid,
+            models.Inventory.quantity >= quantity
+        )
+        .order_by(func.random())
+        .limit(1)
+    )
+    if skip_locked:
+        bucket_id = bucket_id.with_for_update(skip_locked=True)
+
+    result = await db.execute(
+        update(models.Inventory)
+        .where(
+            models.Inventory.id == bucket_id.scalar_subquery(),
+            models.Inventory.quantity >= quantity
+        )
+        .values(quantity=models.Inventory.quantity - quantity)
+        .returning(models.Inventory.quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+    return result.scalars().first()
 
-    return inventory_list
+
+# Fallback for a sharded product when no single bucket holds enough on its own
+async def decrement_inventory_buckets(db: AsyncSession, product_uuid: str, quantity: int) -> int:
+    buckets = await lock_inventory_buckets(db, product_uuid)
+
+    if sum(bucket.quantity for bucket in buckets) < quantity:
+        raise HTTPException(status_code=400, detail="Insufficient stock")
+
+    take_from_buckets(buckets, quantity)
+    await db.flush()
+
+    return sum(bucket.quantity for bucket in buckets)
+
+
+# Lock every bucket of a product in bucket order so two lockers cannot deadlock
+async def lock_inventory_buckets(db: AsyncSession, product_uuid: str) -> list[models.Inventory]:
+    result = await db.execute(
+        select(models.Inventory)
+        .filter(models.Inventory.product_id == product_uuid)
+        .order_by(models.Inventory.bucket)
+        .with_for_update()
+    )
+
+    return list(result.scalars().all())
+
+
+# Drain locked buckets front to back, the caller checked they hold enough
+def take_from_buckets(buckets: list[models.Inventory], quantity: int) -> None:
+    still_needed = quantity
+    for bucket in buckets:
+        if not still_needed:
+            break
+
+        taken = min(bucket.quantity, still_needed)
+        bucket.quantity -= taken
+        still_needed -= taken
 
 
 # ================ [ Order ] ================
 
-async def process_order(cu: CrudUtil, order_data: schemas.OrderCreate, max_retries: int = 3):
+async def process_order(cu: AsyncCrudUtil, order_data: schemas.OrderCreate):
     try:
-        # Start a new transaction
-        with cu.db.begin() as transaction:
-            # Check inventory with FOR UPDATE to acquire a lock
-            inventory = cu.db.query(models.Inventory).filter(
-                models.Inventory.product_id == order_data.product_id
-            ).with_for_update().first()
-
-            if not inventory or inventory.quantity < order_data.quantity:
-                raise HTTPException(status_code=400, detail="Insufficient stock")
-
-            # Process the order
-            new_order = models.Order(
-                product_id=order_data.product_id,
-                quantity=order_data.quantity,
-                status=models.OrderStatus.pending
-            )
-            cu.db.add(new_order)
-            cu.db.flush()
-
-            # Log the order creation
-            log_entry = models.OrderLog(
-                order_id=new_order.uuid,
-                status=models.OrderStatus.pending,
-                processed_at=datetime.utcnow(),
-                error_message=None
+        # Phase 1: reserve the stock in a short transaction, shared with the
+        # other orders for the same product when coalescing is on
+        if settings.order_coalesce_enabled:
+            order, reservation = await order_coalescer.submit(order_data.product_id, order_data)
+            orders, reservations = [order], [reservation]
+        else:
+            async with cu.db.begin():
+                orders, reservations = await reserve_order_lines(cu.db, [order_data])
+
+        # Phase 2: payment runs without any transaction or row lock held
+        payment_success = await get_payment_client().pay(orders[0].uuid)
+
+        # Phase 3: confirm the order or release the reservation
+        async with cu.db.begin():
+            if settings.order_coalesce_enabled:
+                # the coalescer's session is closed, attach its rows to ours without a reload
+                orders = [await cu.db.merge(order, load=False) for order in orders]
+            await settle_order_lines(cu.db, orders, reservations, payment_success)
+
+        # created_at came back with the INSERT, the object is complete
+        return schemas.OrderSchema.model_validate(orders[0])
+
+    except SQLAlchemyError as e:
+        # Handle exceptions and rollback if necessary
+        await cu.db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error occurred: {e}") from e
+
+
+# Reserve a group of orders for one product under a single lock, in arrival order.
+# Returns one (order, reservation) pair or exception per line.
+async def reserve_product_batch(
+    product_id: str,
+    lines: list[schemas.OrderCreate]
+) -> list[Any]:
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            buckets = await lock_inventory_buckets(session, product_id)
+            available = sum(bucket.quantity for bucket in buckets)
+
+            accepted: list[schemas.OrderCreate] = []
+            for line in lines:
+                if line.quantity <= available:
+                    available -= line.quantity
+                    accepted.append(line)
+
+            take_from_buckets(buckets, sum(line.quantity for line in accepted))
+            orders, reservations = await record_pending_orders(session, accepted)
+
+    if accepted:
+        read_cache.invalidate(models.Inventory)
+
+    reserved = iter(zip(orders, reservations))
+    accepted_ids = {id(line) for line in accepted}
+
+    return [
+        next(reserved) if id(line) in accepted_ids
+        else HTTPException(status_code=400, detail="Insufficient stock")
+        for line in lines
+    ]
+
+
+# Fail the orders whose caller was cancelled while their batch was reserved
+# and give the stock back now instead of when the reservation expires
+async def release_product_batch(
+    product_id: str,
+    reserved: list[tuple[models.Order, models.Reservation]]
+) -> None:
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            orders = [await session.merge(order, load=False) for order, _ in reserved]
+            await settle_order_lines(
+                session,
+                orders,
+                [reservation for _, reservation in reserved],
+                payment_success=False,
+                error_message="Order cancelled before payment"
             )
-            cu.db.add(log_entry)
 
-            # Retry logic for payment
-            payment_success = await retry_payment(max_retries)
 
-            if payment_success:
-                # Update inventory and order status within the same transaction
-                inventory.quantity -= order_data.quantity
-                new_order.status = models.OrderStatus.processed
-
-                # Log the successful payment
-                log_entry = models.OrderLog(
-                    order_id=new_order.uuid,
-                    status=models.OrderStatus.processed,
-                    processed_at=datetime.utcnow(),
-                    error_message=None
-                )
-                cu.db.add(log_entry)
+order_coalescer = Coalescer(
+    flush=reserve_product_batch,
+    window=settings.order_coalesce_window_ms / 1000,
+    max_batch=settings.order_coalesce_max_batch,
+    release=release_product_batch,
+)
 
-            else:
-                # Revert Order if payment fails within the same transaction
-                new_order.status = models.OrderStatus.failed
-
-                # Log the failed payment
-                log_entry = models.OrderLog(
-                    order_id=new_order.uuid,
-                    status=models.OrderStatus.failed,
-                    processed_at=datetime.utcnow(),
-                    error_message="Payment failed after retries"
-                )
-                cu.db.add(log_entry)
 
-            # Commit the transaction to save all changes
-            cu.db.commit()
+# Process a whole basket with one transaction per phase and one payment call
+async def process_order_batch(
+    cu: AsyncCrudUtil,
+    batch_data: schemas.OrderBatchCreate
+) -> schemas.OrderList:
+    if not batch_data.items:
+        raise HTTPException(status_code=400, detail="Order batch is empty")
+
+    try:
+        async with cu.db.begin():
+            orders, reservations = await reserve_order_lines(cu.db, batch_data.items)
 
-        # Fetch the order in a new session for validation
-        with SessionLocal() as session:
-            # Re-query the order to get it in the new session
-            order_in_db = session.query(models.Order).filter_by(uuid=new_order.uuid).first()
-            if not order_in_db:
-                raise HTTPException(status_code=404, detail="Order not found")
+        # The first order's uuid identifies the basket with the provider
+        payment_success = await get_payment_client().pay(orders[0].uuid)
 
-            # Create OrderSchema instance using model_validate
-            return schemas.OrderSchema.model_validate(order_in_db)
+        async with cu.db.begin():
+            await settle_order_lines(cu.db, orders, reservations, payment_success)
+
+        return schemas.OrderList(
+            count=len(orders),
+            items=[schemas.OrderSchema.model_validate(order) for order in orders]
+        )
 
     except SQLAlchemyError as e:
-        # Handle exceptions and rollback if necessary
-        cu.db.rollback()
+        await cu.db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error occurred: {e}") from e
 
 
-async def retry_payment(max_retries: int):
-    attempt = 0
-    while attempt < max_retries:
-        attempt += 1
-        print(f"Attempting payment, try {attempt} of {max_retries}")
-        payment_success = await simulate_payment()
+# Reserve the stock and leave the payment to the queue workers
+async def enqueue_order(cu: AsyncCrudUtil, order_data: schemas.OrderCreate) -> schemas.OrderSchema:
+    try:
+        async with cu.db.begin():
+            orders, _ = await reserve_order_lines(cu.db, [order_data], claimed=False)
 
-        if payment_success:
-            return True
+        return schemas.OrderSchema.model_validate(orders[0])
+
+    except SQLAlchemyError as e:
+        await cu.db.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error occurred: {e}") from e
+
+
+# Claim the oldest queued order and run its payment, returns False when the queue is empty
+async def process_next_queued_order(db: AsyncSession) -> bool:
+    async with db.begin():
+        # SKIP LOCKED lets several workers, processes or nodes drain the same queue
+        result = await db.execute(
+            select(models.Order).filter(
+                models.Order.status == models.OrderStatus.pending,
+                models.Order.claimed_at.is_(None)
+            ).order_by(models.Order.id).limit(1).with_for_update(skip_locked=True)
+        )
+        order = result.scalars().first()
+
+        if not order:
+            return False
+
+        claimed_at = datetime.utcnow()
+        order.claimed_at = claimed_at
+
+        result = await db.execute(
+            select(models.Reservation).filter(
+                models.Reservation.order_id == order.uuid
+            )
+        )
+        reservations = list(result.scalars().all())
 
-        # Exponential backoff: wait before retrying
-        await asyncio.sleep(2 ** attempt)
+        # The TTL covers the payment, not the time the order waited in the queue
+        expires_at = claimed_at + timedelta(seconds=settings.reservation_ttl_seconds)
+        for reservation in reservations:
+            reservation.expires_at = expires_at
 
-    # After max retries, return failure
-    return False
+    payment_success = await get_payment_client().pay(order.uuid)
 
+    async with db.begin():
+        await settle_order_lines(db, [order], reservations, payment_success)
 
-async def simulate_payment():
-    await asyncio.sleep(1)  # Simulate external payment service
-    # Simulate payment result, randomize success/failure for testing
     return True
 
 
-def get_all_orders(cu: CrudUtil, skip: int, limit: int) -> schemas.OrderList:
-    orders: dict[str, Any] = cu.list_model(
+# Current status of an order together with its log history
+async def get_order_detail(cu: AsyncCrudUtil, uuid: str) -> schemas.OrderDetailSchema:
+    result = await cu.db.execute(
+        select(models.Order)
+        .filter(models.Order.uuid == uuid)
+        .options(selectinload(models.Order.order_logs))
+    )
+    order = result.scalars().first()
+
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    order_detail = schemas.OrderDetailSchema.model_validate(order)
+    order_detail.order_logs.sort(key=lambda log: log.processed_at)
+
+    return order_detail
+
+
+# Take the stock for every line and record pending orders, the caller owns the transaction
+async def reserve_order_lines(
+    db: AsyncSession,
+    lines: list[schemas.OrderCreate],
+    claimed: bool = True
+) -> tuple[list[models.Order], list[models.Reservation]]:
+    # One decrement per product, so a product is never locked twice by the same basket
+    quantities: dict[str, int] = {}
+    for line in lines:
+        quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+
+    # Touch the inventory rows in product_id order so concurrent baskets cannot deadlock
+    for product_id in sorted(quantities):
+        try:
+            await decrement_inventory(db, product_id, quantities[product_id])
+        except HTTPException as e:
+            if len(lines) > 1:
+                raise HTTPException(
+                    status_code=e.status_code,
+                    detail=f"{e.detail} for product {product_id}"
+                ) from e
+            raise
+
+    return await record_pending_orders(db, lines, claimed)
+
+
+# Insert the pending orders, their held reservations and creation logs for stock already taken
+async def record_pending_orders(
+    db: AsyncSession,
+    lines: list[schemas.OrderCreate],
+    claimed: bool = True
+) -> tuple[list[models.Order], list[models.Reservation]]:
+    if not lines:
+        return [], []
+
+    claimed_at = datetime.utcnow() if claimed else None
+    orders = [
+        models.Order(
+            product_id=line.product_id,
+            quantity=line.quantity,
+            status=models.OrderStatus.pending,
+            claimed_at=claimed_at
+        )
+        for line in lines
+    ]
+    db.add_all(orders)
+    await db.flush()
+
+    expires_at = datetime.utcnow() + timedelta(seconds=settings.reservation_ttl_seconds)
+    reservations = [
+        models.Reservation(
+            product_id=order.product_id,
+            order_id=order.uuid,
+            quantity=order.quantity,
+            status=models.ReservationStatus.held,
+            expires_at=expires_at
+        )
+        for order in orders
+    ]
+    db.add_all(reservations)
+
+    # Log the order creation
+    for order in orders:
+        add_order_log(db, order.uuid, models.OrderStatus.pending)
+
+    return orders, reservations
+
+
+# Confirm the orders or give their stock back, the caller owns the transaction
+async def settle_order_lines(
+    db: AsyncSession,
+    orders: list[models.Order],
+    reservations: list[models.Reservation],
+    payment_success: bool,
+    error_message: str = "Payment failed after retries"
+) -> None:
+    # The sweeper may have released some reservations while we were paying
+    result = await db.execute(
+        select(models.Reservation).filter(
+            models.Reservation.id.in_([reservation.id for reservation in reservations]),
+            models.Reservation.status == models.ReservationStatus.held
+        ).order_by(models.Reservation.id).with_for_update()
+    )
+    held_reservations = {
+        reservation.order_id: reservation for reservation in result.scalars().all()
+    }
+
+    for order in sorted(orders, key=lambda order: order.product_id):
+        reservation = held_reservations.get(order.uuid)
+
+        # The sweeper already failed the order and logged it
+        if not reservation:
+            if payment_success:
+                # the customer was charged for stock that went back on sale
+                logger.error("Order %s paid after its reservation was released, refund it", order.uuid)
+                add_order_log(
+                    db,
+                    order.uuid,
+                    models.OrderStatus.failed,
+                    "Payment succeeded after the reservation expired, refund required"
+                )
+            continue
+
+        if payment_success:
+            reservation.status = models.ReservationStatus.confirmed
+            order.status = models.OrderStatus.processed
+        else:
+            await release_reservation(db, reservation)
+            order.status = models.OrderStatus.failed
+
+        add_order_log(
+            db, order.uuid, order.status, None if payment_success else error_message
+        )
+
+
+async def get_all_orders(
+    cu: AsyncCrudUtil,
+    skip: int,
+    limit: int,
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    status: OrderStatusEnum | None = None,
+    product_id: str | None = None,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    fields: tuple[str, ...] | None = None
+) -> schemas.OrderList:
+    # An open ended range is bounded by the earliest or latest possible date
+    date_range = None
+    if from_date or to_date:
+        date_range = DateRange(
+            from_date=from_date or date.min,
+            to_date=to_date or date.max
+        )
+
+    orders: dict[str, Any] = await cu.list_model(
         model_to_list=models.Order,
+        list_conditions={
+            "status": models.OrderStatus(status.value) if status else None,
+            "product_id": product_id,
+        },
+        date_range=date_range,
         skip=skip,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        count_strategy=count_strategy,
+        columns=list(fields or schemas.OrderSchema.model_fields)
     )
 
+    if fields:
+        sparse_list: type[schemas.OrderList] = sparse_list_schema(schemas.OrderList, fields)
+        return sparse_list(**orders)
+
     return schemas.OrderList(**orders)
 
 
+# ================ [ Reservation ] ================
+
+# Put the reserved stock back, the caller owns the transaction
+async def release_reservation(db: AsyncSession, reservation: models.Reservation) -> None:
+    # Any bucket of the product can take the stock back
+    bucket_id = (
+        select(models.Inventory.id)
+        .where(models.Inventory.product_id == reservation.product_id)
+        .order_by(func.random())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+    await db.execute(
+        update(models.Inventory)
+        .where(models.Inventory.id == bucket_id)
+        .values(quantity=models.Inventory.quantity + reservation.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    reservation.status = models.ReservationStatus.released
+    invalidate_on_commit(db, models.Inventory)
+
+
+# Release reservations whose order never got confirmed within the TTL
+async def release_expired_reservations(db: AsyncSession, batch_size: int = 100) -> int:
+    async with db.begin():
+        # SKIP LOCKED leaves reservations that are being confirmed right now alone.
+        # Queued orders nobody claimed yet keep their stock until a worker does,
+        # however long the queue is
+        result = await db.execute(
+            select(models.Reservation)
+            .join(models.Order, models.Order.uuid == models.Reservation.order_id)
+            .filter(
+                models.Reservation.status == models.ReservationStatus.held,
+                models.Reservation.expires_at < datetime.utcnow(),
+                models.Order.claimed_at.is_not(None)
+            )
+            .order_by(models.Reservation.id)
+            .limit(batch_size)
+            .with_for_update(of=models.Reservation, skip_locked=True)
+        )
+        reservations = result.scalars().all()
+
+        # Give the stock back in product_id order, like the order paths do
+        for reservation in sorted(reservations, key=lambda reservation: reservation.product_id):
+            await release_reservation(db, reservation)
+            await db.execute(
+                update(models.Order)
+                .where(models.Order.uuid == reservation.order_id)
+                .values(status=models.OrderStatus.failed)
+            )
+            add_order_log(
+                db,
+                reservation.order_id,
+                models.OrderStatus.failed,
+                "Reservation expired before payment completed"
+            )
+
+    return len(reservations)
+
+
 # ================ [ OrderLog ] ================
 
-def get_all_order_logs(cu) -> list[schemas.OrderLogSchema]:
-    order_logs = cu.db.query(models.OrderLog).all()
-    return order_logs
\ No newline at end of file
+# Filters shared by the order log page and the export
+def order_log_conditions(
+    order_id: str | None = None,
+    status: OrderStatusEnum | None = None,
+    processed_from: datetime | None = None,
+    processed_to: datetime | None = None
+) -> list[Any]:
+    conditions: list[Any] = []
+    if order_id is not None:
+        conditions.append(models.OrderLog.order_id == order_id)
+    if status is not None:
+        conditions.append(models.OrderLog.status == models.OrderStatus(status.value))
+    if processed_from is not None:
+        conditions.append(models.OrderLog.processed_at >= processed_from)
+    if processed_to is not None:
+        conditions.append(models.OrderLog.processed_at <= processed_to)
+
+    return conditions
+
+
+async def get_all_order_logs(
+    cu: AsyncCrudUtil,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    order_id: str | None = None,
+    status: OrderStatusEnum | None = None,
+    processed_from: datetime | None = None,
+    processed_to: datetime | None = None
+) -> schemas.OrderLogList:
+    conditions = order_log_conditions(order_id, status, processed_from, processed_to)
+
+    # Like list_model, only offset pages and the first keyset page can take the
+    # total from the window, later keyset pages would count from the cursor on
+    window_count = count_strategy == CountStrategy.exact_window and not cursor
+    entities: list[Any] = [models.OrderLog]
+    if window_count:
+        entities.append(func.count().over())
+
+    # The order is loaded up front, lazy loads are not possible on an AsyncSession
+    statement = (
+        select(*entities)
+        .filter(*conditions)
+        .options(selectinload(models.OrderLog.order))
+        .order_by(models.OrderLog.id)
+        .limit(limit)
+    )
+
+    if cursor:
+        statement = statement.filter(keyset_condition(
+            models.OrderLog, "id", "asc", decode_cursor(models.OrderLog, "id", cursor)
+        ))
+    elif cursor is None:
+        statement = statement.offset(skip)
+
+    count: int | None = None
+    if window_count:
+        rows = (await cu.db.execute(statement)).all()
+        order_logs = [row[0] for row in rows]
+        if rows:
+            count = int(rows[0][1])
+        elif not skip or cursor is not None:
+            count = 0
+    else:
+        order_logs = list((await cu.db.execute(statement)).scalars().all())
+
+    if count_strategy == CountStrategy.estimated:
+        count = await cu.get_model_count_estimate(
+            models.OrderLog,
+            select(models.OrderLog).filter(*conditions),
+            filtered=bool(conditions)
+        )
+    if count is None and count_strategy != CountStrategy.none:
+        result = await cu.db.execute(
+            select(func.count(models.OrderLog.id)).filter(*conditions)
+        )
+        count = result.scalar_one()
+
+    return schemas.OrderLogList(
+        count=count,
+        items=order_logs,
+        next_cursor=next_cursor(order_logs, limit, "id") if cursor is not None else None
+    )
+
+
+# Stream every matching log row with a server-side cursor, memory stays flat
+async def export_order_logs(
+    export_format: ExportFormat,
+    order_id: str | None = None,
+    status: OrderStatusEnum | None = None,
+    processed_from: datetime | None = None,
+    processed_to: datetime | None = None,
+    batch_size: int = 1000
+) -> AsyncIterator[str]:
+    columns = ["uuid", "order_id", "status", "processed_at", "error_message"]
+    statement = (
+        select(*[getattr(models.OrderLog, column) for column in columns])
+        .filter(*order_log_conditions(order_id, status, processed_from, processed_to))
+        .order_by(models.OrderLog.id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    if export_format == ExportFormat.csv:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        yield buffer.getvalue()
+
+    # The request's session is closed once the route returns, so the stream owns its own
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(statement)
+
+        async for rows in result.partitions():
+            if export_format == ExportFormat.csv:
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in rows:
+                    writer.writerow([
+                        row.uuid,
+                        row.order_id,
+                        row.status.value,
+                        row.processed_at.isoformat(),
+                        row.error_message or ""
+                    ])
+                yield buffer.getvalue()
+
+            else:
+                yield "".join(
+                    json.dumps({
+                        "uuid": row.uuid,
+                        "order_id": row.order_id,
+                        "status": row.status.value,
+                        "processed_at": row.processed_at.isoformat(),
+                        "error_message": row.error_message
+                    }) + "\n"
+                    for row in rows
+                )
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config.config import settings
+from app.config.database import AsyncSessionLocal
+from app.product import models
+
+logger = logging.getLogger(__name__)
+
+# rows written through a session wait here until its transaction commits
+PENDING_LOGS_KEY = "pending_order_logs"
+
+
+class OrderLogSink:
+    """
+    Write-behind buffer for OrderLog rows. Rows are queued once the order
+    transaction that produced them commits and are written by a background
+    flusher in multi-row INSERTs, when batch_size rows are waiting or every
+    flush_interval seconds. Rows still buffered when the process dies are
+    lost; with synchronous_commit off a flushed batch can be lost as well
+    on a database crash.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_buffered: int = 50000,
+        synchronous_commit: bool = True,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.synchronous_commit = synchronous_commit
+        self.buffer: list[dict[str, Any]] = []
+        self.wakeup = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.dropped = 0
+
+    def enqueue(self, rows: list[dict[str, Any]]) -> None:
+        self.buffer.extend(rows)
+
+        # a database outage must not grow the buffer without bound
+        overflow = len(self.buffer) - self.max_buffered
+        if overflow > 0:
+            del self.buffer[:overflow]
+            self.dropped += overflow
+            logger.error("Order log buffer full, dropped %s rows", overflow)
+
+        if len(self.buffer) >= self.batch_size:
+            self.wakeup.set()
+
+    async def flush(self) -> int:
+        async with self.flush_lock:
+            written = 0
+            while self.buffer:
+                batch = self.buffer[:self.batch_size]
+                del self.buffer[:self.batch_size]
+
+                try:
+                    async with AsyncSessionLocal() as session:
+                        async with session.begin():
+                            if not self.synchronous_commit:
+                                await session.execute(text("SET LOCAL synchronous_commit = off"))
+                            await session.execute(insert(models.OrderLog), batch)
+                except BaseException:
+                    # put the batch back in front, also when cancelled at shutdown,
+                    # and retry on the next tick
+                    self.buffer[:0] = batch
+                    raise
+
+                written += len(batch)
+
+            return written
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("Order log flush failed, %s rows buffered: %r", len(self.buffer), e)
+
+    async def close(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Order log flush on shutdown failed, lost %s rows: %r", len(self.buffer), e)
+
+
+order_log_sink = OrderLogSink(
+    batch_size=settings.order_log_batch_size,
+    flush_interval=settings.order_log_flush_interval_seconds,
+    max_buffered=settings.order_log_max_buffered,
+    synchronous_commit=settings.order_log_synchronous_commit,
+)
+
+
+# Write an order status transition, inline with the caller's transaction or
+# handed to the sink once that transaction commits
+def add_order_log(
+    db: AsyncSession,
+    order_id: str,
+    status: models.OrderStatus,
+    error_message: str | None = None
+) -> None:
+    row = {
+        "order_id": order_id,
+        "status": status,
+        "processed_at": datetime.utcnow(),
+        "error_message": error_message,
+    }
+
+    if not settings.order_log_buffered:
+        db.add(models.OrderLog(**row))
+        return
+
+    db.sync_session.info.setdefault(PENDING_LOGS_KEY, []).append(row)
+
+
+@event.listens_for(Session, "after_commit")
+def hand_over_order_logs(session: Session) -> None:
+    rows = session.info.pop(PENDING_LOGS_KEY, None)
+    if rows:
+        order_log_sink.enqueue(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_order_logs(session: Session) -> None:
+    # the orders these rows point at were never written
+    session.info.pop(PENDING_LOGS_KEY, None)
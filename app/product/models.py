@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Table, Integer, String, Float, DateTime, Enum
+from sqlalchemy import Column, ForeignKey, Table, Integer, String, Float, DateTime, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.sqltypes import String
 from sqlalchemy.sql import func
@@ -14,14 +14,28 @@ class OrderStatus(PyEnum):
     failed = "failed"
 
 
+class ReservationStatus(PyEnum):
+    held = "held"
+    confirmed = "confirmed"
+    released = "released"
+
+
 # Many-to-Many association table between Products and Categories
 product_category = Table('product_category', Base.metadata,
     Column('product_id', String(length=50), ForeignKey('products.uuid')),
-    Column('category_id', String(length=50), ForeignKey('categories.uuid'))
+    Column('category_id', String(length=50), ForeignKey('categories.uuid')),
+    # products of a category, joined to products by uuid
+    Index('ix_product_category_category_id_product_id', 'category_id', 'product_id'),
 )
 
 
 class Product(BaseMixin, Base):
+    __table_args__ = (
+        # price range filters and price/created_at sorts, id is the paging tiebreaker
+        Index('ix_products_price_id', 'price', 'id'),
+        Index('ix_products_created_at_id', 'created_at', 'id'),
+    )
+
     name = Column(String(255), nullable=False)
     description = Column(String(255))
     price = Column(Float, nullable=False)
@@ -30,6 +44,14 @@ class Product(BaseMixin, Base):
     orders = relationship("Order", back_populates="product")
 
 
+# case-insensitive name prefix search, LIKE 'abc%' on lower(name)
+Index(
+    'ix_products_name_lower_pattern',
+    func.lower(Product.name).label('name_lower'),
+    postgresql_ops={'name_lower': 'text_pattern_ops'},
+)
+
+
 class Category(BaseMixin, Base):
     name = Column(String(255), nullable=False)
     description = Column(String(255))
@@ -37,22 +59,57 @@ class Category(BaseMixin, Base):
 
 
 class Inventory(BaseMixin, Base):
+    __table_args__ = (
+        Index('ix_inventories_product_id_bucket', 'product_id', 'bucket', unique=True),
+    )
+
     product_id = Column(String(length=50), ForeignKey('products.uuid'), nullable=False)
+    # hot products spread their stock over several bucket rows
+    bucket = Column(Integer, nullable=False, default=0, server_default="0")
     quantity = Column(Integer, nullable=False)
     product = relationship("Product", back_populates="inventory")
 
 
 class Order(BaseMixin, Base):
+    __table_args__ = (
+        # queue of intake orders waiting for a worker
+        Index('ix_orders_queue', 'id', postgresql_where=text("status = 'pending' AND claimed_at IS NULL")),
+        Index('ix_orders_product_id_status_date', 'product_id', 'status', 'date'),
+        Index('ix_orders_status_date', 'status', 'date'),
+        Index('ix_orders_pending', 'created_at', postgresql_where=text("status = 'pending'")),
+    )
+
     product_id = Column(String(length=50), ForeignKey('products.uuid'), nullable=False)
     quantity = Column(Integer, nullable=False)
     status = Column(Enum(OrderStatus), default=OrderStatus.pending, nullable=False)
+    # set once a request or a queue worker owns the payment for this order
+    claimed_at = Column(DateTime, nullable=True)
     product = relationship("Product", back_populates="orders")
     order_logs = relationship("OrderLog", back_populates="order")
 
 
 class OrderLog(BaseMixin, Base):
+    __table_args__ = (
+        Index('ix_orderlogs_order_id_processed_at', 'order_id', 'processed_at'),
+        Index('ix_orderlogs_processed_at', 'processed_at'),
+    )
+
     order_id = Column(String(length=50), ForeignKey('orders.uuid'), nullable=False)
     status = Column(Enum(OrderStatus), nullable=False)
     processed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     error_message = Column(String(255), nullable=True)
-    order = relationship("Order", back_populates="order_logs")
\ No newline at end of file
+    order = relationship("Order", back_populates="order_logs")
+
+
+class Reservation(BaseMixin, Base):
+    __table_args__ = (
+        Index('ix_reservations_order_id', 'order_id'),
+        # what the sweeper scans for
+        Index('ix_reservations_held', 'expires_at', postgresql_where=text("status = 'held'")),
+    )
+
+    product_id = Column(String(length=50), ForeignKey('products.uuid'), nullable=False)
+    order_id = Column(String(length=50), ForeignKey('orders.uuid'), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    status = Column(Enum(ReservationStatus), default=ReservationStatus.held, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,8 +1,17 @@
 from typing import Any
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Response, UploadFile
+from fastapi.responses import StreamingResponse
 
+from app.config.config import settings
 from app.product import cruds, schemas
 from app.utils.crud_util import CrudUtil
+from app.utils.async_crud_util import AsyncCrudUtil
+from app.utils.cache_util import read_cache
+from app.utils.etag_util import etag_matches, make_etag, not_modified
+from app.utils.response_util import json_response, select_fields
+from app.utils.enums import CountStrategy, ExportFormat, ProductSort, SortOrder
+from app.mixins.commons import OrderStatusEnum
 from sqlalchemy.orm import Session
 
 category_router = APIRouter(prefix="/category", tags=["Category"])
@@ -10,6 +19,7 @@ product_router = APIRouter(prefix="/product", tags=["Product"])
 inventory_router = APIRouter(prefix="/inventory", tags=["Inventory"])
 order_router = APIRouter(prefix="/order", tags=["Order"])
 order_log_router = APIRouter(prefix="/order-log", tags=["Order Logs"])
+cache_router = APIRouter(prefix="/cache", tags=["Cache"])
 
 # ================ [ Categories ] ================
 
@@ -23,24 +33,43 @@ def create_category(
     return cruds.create_category(cu, category_data)
 
 
-@category_router.get("")
+@category_router.get("", response_model=schemas.CategoryList)
 def list_categories(
     cu: CrudUtil = Depends(CrudUtil),
     skip: int = 0,
     limit: int = 100,
-) -> schemas.CategoryList:
-    return cruds.list_category(cu, skip, limit)
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    fields: str | None = None,
+) -> Any:
+    category_fields = select_fields(schemas.CategorySchema, fields)
+    categories = cruds.list_category(cu, skip, limit, cursor, count_strategy, category_fields)
+
+    # a trimmed page has its own schema, FastAPI would serialize it as CategoryList
+    if category_fields:
+        return json_response(type(categories), categories, validated=True)
+
+    return categories
 
 #
 @category_router.get(
-    "/{uuid}"
+    "/{uuid}", response_model=schemas.CategorySchema
 )
 def category_detail(
     *,
     cu: CrudUtil = Depends(CrudUtil),
     uuid: str,
-) -> schemas.CategorySchema:
-    return cruds.get_category_by_uuid(cu, uuid)
+    response: Response,
+    if_none_match: str | None = Header(None),
+) -> Any:
+    category = cruds.get_category_by_uuid(cu, uuid)
+
+    etag = cruds.get_category_etag(category)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    return category
 
 
 @category_router.put(
@@ -78,24 +107,72 @@ def create_product(
     return cruds.create_product(cu, product_data)
 
 
-@product_router.get("")
+@product_router.post(
+    "/import"
+)
+def import_products(
+    file: UploadFile = File(...),
+    chunk_size: int = settings.product_import_chunk_size,
+    cu: CrudUtil = Depends(CrudUtil),
+) -> schemas.ProductImportResult:
+    return cruds.import_products(cu, file.file, file.filename, chunk_size)
+
+
+@product_router.get("", response_model=schemas.ProductList)
 def list_products(
     cu: CrudUtil = Depends(CrudUtil),
     skip: int = 0,
     limit: int = 100,
-) -> schemas.ProductList:
-    return cruds.list_products(cu, skip, limit)
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    fields: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    category_uuid: str | None = None,
+    name_prefix: str | None = None,
+    sort: ProductSort = ProductSort.id,
+    order: SortOrder = SortOrder.asc,
+) -> Any:
+    product_fields = select_fields(schemas.ProductSchema, fields)
+    products = cruds.list_products(
+        cu,
+        skip,
+        limit,
+        cursor,
+        count_strategy,
+        product_fields,
+        min_price,
+        max_price,
+        category_uuid,
+        name_prefix,
+        sort,
+        order,
+    )
+
+    if product_fields or settings.fast_json_responses:
+        return json_response(type(products), products, validated=True)
+
+    return products
 
 
 @product_router.get(
-    "/{uuid}"
+    "/{uuid}", response_model=schemas.ProductSchema
 )
 def product_detail(
     *,
     cu: CrudUtil = Depends(CrudUtil),
     uuid: str,
-) -> schemas.ProductSchema:
-    return cruds.get_product_by_uuid(cu, uuid)
+    response: Response,
+    if_none_match: str | None = Header(None),
+) -> Any:
+    product = cruds.get_product_by_uuid(cu, uuid)
+
+    etag = make_etag(product.uuid, product.last_modified)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    response.headers["ETag"] = etag
+    return product
 
 
 @product_router.put(
@@ -123,42 +200,167 @@ def delete_product(
 
 @inventory_router.get("")
 def list_inventories(
+    response: Response,
     cu: CrudUtil = Depends(CrudUtil),
     skip: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    if_none_match: str | None = Header(None),
 ) -> Any:
-    return cruds.get_inventory_list(cu, skip, limit)
+    # Compared before the page is loaded, a match costs one aggregate query
+    etag = cruds.get_inventory_etag(cu, skip, limit, cursor, count_strategy)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    inventories = cruds.get_inventory_list(cu, skip, limit, cursor, count_strategy)
+
+    if settings.fast_json_responses:
+        schema = schemas.InventoryList if cursor is not None else list[schemas.InventorySchema]
+        return json_response(
+            schema, inventories, headers={"ETag": etag}, validated=True
+        )
+
+    response.headers["ETag"] = etag
+    return inventories
+
+
+@inventory_router.put("/{product_uuid}/shard")
+def shard_inventory(
+    *,
+    cu: CrudUtil = Depends(CrudUtil),
+    product_uuid: str,
+    shard_data: schemas.InventoryShardCreate,
+) -> schemas.InventoryShardSchema:
+    return cruds.shard_inventory(cu, product_uuid, shard_data)
 
 
 # ================ [ Order ] ================
 
 @order_router.post("", response_model=schemas.OrderSchema)
-async def create_order(order: schemas.OrderCreate, cu: CrudUtil = Depends(CrudUtil)):
+async def create_order(order: schemas.OrderCreate, cu: AsyncCrudUtil = Depends(AsyncCrudUtil)):
     try:
         return await cruds.process_order(cu, order)
     except HTTPException as e:
         raise e
 
+@order_router.post("/batch", response_model=schemas.OrderList)
+async def create_order_batch(
+    batch: schemas.OrderBatchCreate,
+    cu: AsyncCrudUtil = Depends(AsyncCrudUtil),
+):
+    return await cruds.process_order_batch(cu, batch)
+
+
+@order_router.post("/intake", status_code=202, response_model=schemas.OrderSchema)
+async def create_order_intake(
+    order: schemas.OrderCreate,
+    cu: AsyncCrudUtil = Depends(AsyncCrudUtil),
+):
+    return await cruds.enqueue_order(cu, order)
+
+
 @order_router.get("")
 async def read_orders(
-    cu: CrudUtil = Depends(CrudUtil),
+    cu: AsyncCrudUtil = Depends(AsyncCrudUtil),
     skip: int = 0,
     limit: int = 100,
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    status: OrderStatusEnum | None = None,
+    product_id: str | None = None,
+    from_date: date | None = None,
+    to_date: date | None = None,
+    fields: str | None = None,
 ):
     try:
-        orders = cruds.get_all_orders(cu, skip, limit)
+        order_fields = select_fields(schemas.OrderSchema, fields)
+        orders = await cruds.get_all_orders(
+            cu,
+            skip,
+            limit,
+            cursor,
+            count_strategy,
+            status,
+            product_id,
+            from_date,
+            to_date,
+            order_fields,
+        )
+        if order_fields:
+            return json_response(type(orders), orders, validated=True)
         return orders
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
 
 
+@order_router.get("/{uuid}", response_model=schemas.OrderDetailSchema)
+async def order_detail(
+    *,
+    cu: AsyncCrudUtil = Depends(AsyncCrudUtil),
+    uuid: str,
+):
+    return await cruds.get_order_detail(cu, uuid)
+
+
 # ================ [ OrderLogs ] ================
 @order_log_router.get("")
 async def read_order_logs(
-    cu: CrudUtil = Depends(CrudUtil)
-):
+    cu: AsyncCrudUtil = Depends(AsyncCrudUtil),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_strategy: CountStrategy = CountStrategy.exact,
+    order_id: str | None = None,
+    status: OrderStatusEnum | None = None,
+    processed_from: datetime | None = None,
+    processed_to: datetime | None = None,
+) -> schemas.OrderLogList:
     try:
-        order_logs = cruds.get_all_order_logs(cu)
+        order_logs = await cruds.get_all_order_logs(
+            cu,
+            skip,
+            limit,
+            cursor,
+            count_strategy,
+            order_id,
+            status,
+            processed_from,
+            processed_to,
+        )
         return order_logs
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {e}")
+
+
+@order_log_router.get("/export")
+async def export_order_logs(
+    export_format: ExportFormat = ExportFormat.ndjson,
+    order_id: str | None = None,
+    status: OrderStatusEnum | None = None,
+    processed_from: datetime | None = None,
+    processed_to: datetime | None = None,
+) -> StreamingResponse:
+    rows = cruds.export_order_logs(
+        export_format, order_id, status, processed_from, processed_to
+    )
+
+    if export_format == ExportFormat.csv:
+        return StreamingResponse(
+            rows,
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="order-logs.csv"'},
+        )
+
+    return StreamingResponse(rows, media_type="application/x-ndjson")
+
+
+# ================ [ Cache ] ================
+
+@cache_router.get("/stats")
+def cache_stats() -> dict[str, Any]:
+    return read_cache.stats()
@@ -27,6 +27,17 @@ class ProductSchema(BaseUACSchemaMixin):
 class ProductList(ListBase):
     items: list[ProductSchema]
 
+
+class ProductImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class ProductImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: list[ProductImportError] = []
+
 # ================ [ Categories ] ================
 
 class CategoryCreate(BaseModel):
@@ -59,11 +70,22 @@ class InventorySchema(BaseModel):
     product_id: str
     quantity: int
 
+    class Config:
+        from_attributes = True
+
 
 class InventoryList(ListBase):
     items: list[InventorySchema]
 
 
+class InventoryShardCreate(BaseModel):
+    buckets: int
+
+
+class InventoryShardSchema(InventorySchema):
+    buckets: int
+
+
 # ================ [ Order ] ================
 
 
@@ -72,8 +94,13 @@ class OrderCreate(BaseModel):
     quantity: int
 
 
+class OrderBatchCreate(BaseModel):
+    items: list[OrderCreate]
+
+
 class OrderSchema(BaseModel):
     id: int
+    uuid: str
     product_id: str
     quantity: int
     status: OrderStatusEnum
@@ -87,6 +114,19 @@ class OrderList(ListBase):
     items: list[OrderSchema]
 
 
+class OrderLogEntrySchema(BaseModel):
+    status: OrderStatusEnum
+    processed_at: datetime
+    error_message: str | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class OrderDetailSchema(OrderSchema):
+    order_logs: list[OrderLogEntrySchema] = []
+
+
 # ================ [ OrderLogs ] ================
 
 class OrderLogSchema(BaseModel):
@@ -94,10 +134,13 @@ class OrderLogSchema(BaseModel):
     order_id: str
     status: OrderStatusEnum
     processed_at: datetime
-    error_message: str = None
+    error_message: str | None = None
 
     order: OrderSchema | None = None
 
+    class Config:
+        from_attributes = True
+
 
 class OrderLogList(ListBase):
     items: list[OrderLogSchema]
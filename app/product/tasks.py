@@ -0,0 +1,33 @@
+import asyncio
+
+from app.config.config import settings
+from app.config.database import AsyncSessionLocal
+from app.product import cruds
+
+
+# Periodically reclaim stock held by reservations that outlived their TTL
+async def reservation_sweeper() -> None:
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                released = await cruds.release_expired_reservations(session)
+                if released:
+                    print(f"Released {released} expired reservations")
+        except Exception as e:
+            print(e)
+
+        await asyncio.sleep(settings.reservation_sweep_interval_seconds)
+
+
+# Drain intake orders until cancelled, sleeping only when the queue is empty
+async def order_worker() -> None:
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                processed = await cruds.process_next_queued_order(session)
+        except Exception as e:
+            print(e)
+            processed = False
+
+        if not processed:
+            await asyncio.sleep(settings.order_worker_poll_interval_seconds)
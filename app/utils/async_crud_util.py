@@ -0,0 +1,519 @@
+from sqlalchemy import false, or_, select
+from app.mixins.commons import DateRange
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.elements import and_
+from sqlalchemy.sql.functions import func
+from app.utils.enums import ActionStatus, CountStrategy
+from app.utils.count_util import (
+    estimate_from_plan,
+    estimate_from_reltuples,
+    explain_statement,
+    reltuples_statement,
+)
+from app.utils.statement_cache import (
+    count_statement,
+    lookup_statement,
+    where_clause,
+    where_shape,
+)
+from app.utils.pagination import (
+    decode_cursor,
+    keyset_condition,
+    keyset_order_by,
+    next_cursor,
+)
+from app.config import database as db
+from typing import Any, AsyncGenerator
+from pydantic.main import BaseModel
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import Depends, HTTPException
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with db.AsyncSessionLocal() as dbase:
+        yield dbase
+
+
+class AsyncCrudUtil:
+    """
+    Async counterpart of CrudUtil, backed by an AsyncSession so that
+    database I/O is awaited instead of blocking the event loop.
+    """
+
+    def __init__(self, db: AsyncSession = Depends(get_async_db)):
+        self.db = db
+
+    async def create_model(
+        self, model_to_create: Any, create: BaseModel, autocommit: bool = True
+    ) -> Any:
+        try:
+            columns: set[str] = set(model_to_create.__table__.c.keys())
+            create_columns: set[str] = set(create.model_dump().keys())
+
+            db_model = model_to_create(
+                **create.model_dump(exclude=set(create_columns - columns))
+            )
+
+            if not autocommit:
+                await self.__add_no_commit(db_model)
+                return db_model
+            else:
+                await self.__add_and_commit(db_model)
+                return db_model
+
+        except IntegrityError as e:
+            print(e)
+            raise HTTPException(
+                status_code=403,
+                detail=f"Cannot create {model_to_create.__qualname__}, \
+                    possible duplicate or invalid attributes",
+            )
+
+
+    async def get_model_or_404(
+        self,
+        model_to_get: Any,
+        model_conditions: dict[str, Any] = {},
+        order_by_column: str = "id",
+        order: str = "asc",
+        custom_error: str = "",
+        load_options: list[Any] = [],
+    ) -> Any:
+        try:
+            shape, params = where_shape(model_conditions)
+            statement = lookup_statement(model_to_get, shape, order_by_column, order)
+            if load_options:
+                statement = statement.options(*load_options)
+
+            result = await self.db.execute(statement, params)
+            return result.scalars().one()
+
+        except AttributeError:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Invalid attribute for {model_to_get.__qualname__}",
+            )
+
+        except Exception as e:
+            print(e)
+            if custom_error:
+                raise HTTPException(404, detail=custom_error)
+
+            raise HTTPException(404, detail=f"{model_to_get.__qualname__} not found")
+
+
+    async def update_model(
+        self,
+        model_to_update: Any,
+        update: BaseModel,
+        update_conditions: dict[str, Any] = {},
+        autocommit: bool = True,
+    ) -> Any:
+        db_model = await self.get_model_or_404(
+            model_to_get=model_to_update, model_conditions=update_conditions
+        )
+
+        try:
+            if not autocommit:
+                await self.__update_no_commit(db_model, update)
+                return db_model
+            else:
+                await self.__update_and_commit(db_model, update)
+                return db_model
+
+        except Exception as e:
+            print(e)
+            raise HTTPException(
+                status_code=403, detail=f"{model_to_update.__qualname__} update failed"
+            )
+
+    async def list_model(
+        self,
+        model_to_list: Any,
+        list_conditions: dict[str, Any] = {},
+        date_range: DateRange | None = None,
+        skip: int = 0,
+        limit: int | None = 100,
+        order_by_column: str = "id",
+        order: str = "asc",
+        count_by_column: str = "id",
+        join_conditions: dict[Any, Any] = {},
+        conjunction: str = "and",
+        cursor: str | None = None,
+        count_strategy: CountStrategy = CountStrategy.exact,
+        load_options: list[Any] = [],
+        columns: list[str] = [],
+    ) -> dict[str, Any]:
+        """
+        Passing a cursor (an empty string for the first page) switches from
+        offset paging to keyset paging on (order_by_column, id); the returned
+        next_cursor then fetches the following page and skip is ignored.
+
+        list_conditions and join_conditions keys are column names with an
+        optional operator, e.g. {"price__gte": 10, "status__not_in": [...],
+        "name__prefix": "ab", "deleted_at__is_null": True}; see
+        app.utils.statement_cache for the full list. Unknown columns and
+        operators are answered with a 403 before any SQL runs.
+
+        count_strategy picks how the total is computed: a separate exact
+        count, count(*) OVER () on the page query (keyset pages after the
+        first fall back to the exact count, the window would only cover the
+        rows from the cursor onwards), a planner estimate, or no count at all
+        (count is None).
+
+        load_options are loader options such as selectinload(...) applied to
+        the page query, so relationships the response serializes are fetched
+        up front instead of one lazy load per row.
+
+        columns switches to projection: only these columns (plus id and the
+        order column, which paging needs) are selected and items are plain
+        rows instead of ORM objects, so load_options do not apply.
+        """
+        if "limit" in list_conditions:
+            limit = list_conditions["limit"]
+            del list_conditions["limit"]
+
+        if "skip" in list_conditions:
+            skip = list_conditions["skip"]
+            del list_conditions["skip"]
+
+        if "order" in list_conditions:
+            order = list_conditions["order"]
+            del list_conditions["order"]
+
+        limit = None if limit == 0 else limit
+        try:
+            # the filter tree is built once per shape, the values are bound
+            shape, params = where_shape(list_conditions, join_conditions, date_range)
+            conditions: list[Any] = [where_clause(model_to_list, shape, conjunction)]
+
+            join_models = [join_model for join_model in join_conditions]
+
+            projection = self.__projection(model_to_list, columns, order_by_column)
+            entities = projection or [model_to_list]
+
+            cursor_values = (
+                decode_cursor(model_to_list, order_by_column, cursor)
+                if cursor
+                else None
+            )
+
+            # past the first keyset page the window only sees the rows after
+            # the cursor, so those pages take the exact count instead
+            window_count = (
+                count_strategy == CountStrategy.exact_window and cursor_values is None
+            )
+
+            try:
+                if window_count:
+                    statement = select(*entities, func.count().over())
+                else:
+                    statement = select(*entities)
+                for join_model in join_models:
+                    statement = statement.join(join_model)
+                base_statement = statement
+                if not projection:
+                    statement = statement.options(*load_options)
+
+                if cursor is None:
+                    statement = self.__make_query(
+                        statement,
+                        model_to_list,
+                        conditions,
+                        order_by_column,
+                        order,
+                        skip,
+                        limit,
+                        conjunction,
+                    )
+                else:
+                    statement = self.__make_keyset_query(
+                        statement,
+                        model_to_list,
+                        conditions,
+                        order_by_column,
+                        order,
+                        cursor_values,
+                        limit,
+                        conjunction,
+                    )
+
+                db_model_count: int | None = None
+                if window_count:
+                    rows = (await self.db.execute(statement, params)).all()
+                    # projected rows keep the trailing count column, schemas ignore it
+                    model_list = rows if projection else [row[0] for row in rows]
+                    if rows:
+                        db_model_count = int(rows[0][-1])
+                    elif not skip:
+                        db_model_count = 0
+
+                elif projection:
+                    model_list = list((await self.db.execute(statement, params)).all())
+
+                else:
+                    model_list = list(
+                        (await self.db.execute(statement, params)).scalars().all()
+                    )
+
+                if count_strategy == CountStrategy.estimated:
+                    db_model_count = await self.get_model_count_estimate(
+                        model_to_list,
+                        self.__filter_query(base_statement, conditions, conjunction)
+                        .params(**params),
+                        filtered=bool(params),
+                    )
+
+                # exact, or the fallback when the cheaper strategies had no answer
+                if db_model_count is None and count_strategy != CountStrategy.none:
+                    db_model_count = int(
+                        await self.get_model_count(
+                            model_to_list,
+                            count_by_column,
+                            list_conditions,
+                            date_range,
+                            join_conditions=join_conditions,
+                            conjunction=conjunction,
+                        )
+                    )
+
+            except Exception as e:
+                print(e)
+                db_model_count = 0
+                model_list = []
+
+            return {
+                "items": model_list,
+                "count": db_model_count,
+                "next_cursor": (
+                    next_cursor(model_list, limit, order_by_column)
+                    if cursor is not None
+                    else None
+                ),
+            }
+
+        except HTTPException:
+            raise
+
+        except AttributeError:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Invalid attribute for {model_to_list.__qualname__}",
+            )
+
+        except Exception as e:
+            print(e)
+            raise HTTPException(
+                status_code=404, detail=f"{model_to_list.__qualname__} not found"
+            )
+
+
+    async def delete_model(
+        self,
+        model_to_delete: Any,
+        delete_conditions: dict[str, Any] = {},
+        autocommit: bool = True,
+    ) -> dict[str, ActionStatus]:
+        db_model = await self.get_model_or_404(
+            model_to_get=model_to_delete,
+            model_conditions=delete_conditions,
+        )
+        try:
+            if autocommit:
+                await self.__delete_and_commit(db_model)
+                return {"status": ActionStatus.success}
+            else:
+                await self.__delete_no_commit(db_model)
+                return {"status": ActionStatus.success}
+
+        except Exception as e:
+            print(e)
+            raise HTTPException(
+                status_code=403,
+                detail=f"Cannot delete this {model_to_delete.__qualname__}, "
+                + "check if it's still in use",
+            )
+
+
+    async def get_model_count(
+        self,
+        model_to_count: Any,
+        column_to_count_by: str,
+        model_conditions: dict[str, Any] = {},
+        date_range: DateRange | None = None,
+        join_conditions: dict[Any, Any] = {},
+        conjunction: str = "and",
+    ) -> int:
+        try:
+            shape, params = where_shape(model_conditions, join_conditions, date_range)
+            result = await self.db.execute(
+                count_statement(model_to_count, column_to_count_by, shape, conjunction),
+                params,
+            )
+            db_count = result.scalar_one()
+
+            if not db_count:
+                return 0
+
+            return int(db_count)
+
+        except AttributeError:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Invalid attribute provided for {model_to_count.__qualname__}",
+            )
+
+        except Exception as e:
+            print(e)
+            raise HTTPException(
+                status_code=404,
+                detail=f"Could not retrieve count of {column_to_count_by}. \
+                    Record not found",
+            )
+
+    async def get_model_count_estimate(
+        self,
+        model_to_count: Any,
+        statement: Any = None,
+        filtered: bool = False,
+    ) -> int | None:
+        """
+        Approximate row count from planner statistics: pg_class.reltuples for
+        the whole table, EXPLAIN of the statement when it is filtered.
+        Returns None when no estimate is available.
+        """
+        try:
+            if not filtered:
+                result = await self.db.execute(reltuples_statement(model_to_count))
+                return estimate_from_reltuples(result.scalar())
+
+            result = await self.db.execute(
+                explain_statement(statement, self.db.get_bind().dialect)
+            )
+            return estimate_from_plan(result.scalar())
+
+        except Exception as e:
+            print(e)
+            return None
+
+    def __filter_query(
+        self, statement: Any, conditions: list[Any], conjunction: str
+    ) -> Any:
+        if conjunction == "or":
+            return statement.filter(or_(false(), *conditions))
+
+        return statement.filter(and_(*conditions))
+
+    async def __add_and_commit(self, model_to_add: Any) -> None:
+        # check if model to add is a list
+        if isinstance(model_to_add, list):
+            self.db.add_all(model_to_add)
+        else:
+            self.db.add(model_to_add)
+        await self.db.commit()
+
+    async def __add_no_commit(self, model_to_add: Any) -> None:
+        # check if model to add a list
+        if isinstance(model_to_add, list):
+            self.db.add_all(model_to_add)
+        else:
+            self.db.add(model_to_add)
+
+        await self.db.flush()
+
+    async def __update_and_commit(self, model_to_update: Any, update: BaseModel) -> None:
+        update_dict = self.__remove_invalid_fields(model_to_update, update)
+        for key, value in update_dict.items():
+            setattr(model_to_update, key, value)
+
+        await self.db.commit()
+
+    async def __update_no_commit(self, model_to_update: Any, update: BaseModel) -> None:
+        update_dict = self.__remove_invalid_fields(model_to_update, update)
+
+        for key, value in update_dict.items():
+            setattr(model_to_update, key, value)
+
+        await self.db.flush()
+
+    async def __delete_and_commit(self, model_to_delete: Any) -> None:
+        await self.db.delete(model_to_delete)
+        await self.db.commit()
+
+    async def __delete_no_commit(self, model_to_delete: Any) -> None:
+        await self.db.delete(model_to_delete)
+        await self.db.flush()
+
+    def __projection(
+        self, model: Any, columns: list[str], order_by_column: str
+    ) -> list[Any]:
+        if not columns:
+            return []
+
+        projection: list[Any] = []
+        for column_name in dict.fromkeys(["id", order_by_column, *columns]):
+            # relationships and unknown names are rejected like other bad attributes
+            if column_name not in model.__table__.c:
+                raise AttributeError(column_name)
+            projection.append(getattr(model, column_name))
+
+        return projection
+
+    def __remove_invalid_fields(self, model: Any, data: BaseModel) -> dict[str, Any]:
+        columns: set[str] = set(model.__table__.c.keys())
+        data_fields: set[str] = set(data.model_dump(exclude_unset=True).keys())
+
+        data_dict = data.model_dump(
+            exclude=set(data_fields - columns),
+            exclude_unset=True,
+        )
+
+        return data_dict
+
+    def __make_keyset_query(
+        self,
+        statement: Any,
+        model: Any,
+        conditions: list[Any],
+        order_by_column: str,
+        order: str,
+        cursor_values: tuple[Any, int] | None,
+        limit: int | None,
+        conjunction: str,
+    ) -> Any:
+        if conjunction == "or":
+            statement = statement.filter(or_(false(), *conditions))
+        else:
+            statement = statement.filter(and_(*conditions))
+
+        if cursor_values is not None:
+            statement = statement.filter(
+                keyset_condition(model, order_by_column, order, cursor_values)
+            )
+
+        return statement.order_by(
+            *keyset_order_by(model, order_by_column, order)
+        ).limit(limit)
+
+    def __make_query(
+        self,
+        statement: Any,
+        model: Any,
+        conditions: list[Any],
+        order_by_column: str,
+        order: str,
+        skip: int,
+        limit: int | None,
+        conjunction: str,
+    ) -> Any:
+        # builds the page statement only, the caller awaits its execution
+        if conjunction == "or":
+            statement = statement.filter(or_(false(), *conditions))
+        else:
+            statement = statement.filter(and_(*conditions))
+
+        # id breaks ties, so rows sharing a sort value never hop between pages
+        statement = statement.order_by(*keyset_order_by(model, order_by_column, order))
+
+        return statement.offset(skip).limit(limit)
@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config.config import settings
+
+MISSING = object()
+
+# models changed by a session's open transaction, dropped from the cache on commit
+PENDING_INVALIDATIONS_KEY = "pending_cache_invalidations"
+
+
+class ReadCache:
+    """
+    Bounded LRU cache with a TTL for catalog reads. Every entry is tagged
+    with the tables it was built from, so a write to one model drops the
+    entries of that model and of every entry embedding it.
+    """
+
+    def __init__(self, enabled: bool, max_entries: int, ttl: float):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: OrderedDict[Hashable, tuple[float, set[str], Any]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return MISSING
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key: Hashable, value: Any, tags: set[str]) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, tags, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model: Any) -> None:
+        if not self.enabled:
+            return
+
+        # a mapped class or a plain Table such as an association table
+        table_name = getattr(model, "__table__", model).name
+        with self.lock:
+            stale = [key for key, entry in self.entries.items() if table_name in entry[1]]
+            for key in stale:
+                del self.entries[key]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+read_cache = ReadCache(
+    enabled=settings.cache_enabled,
+    max_entries=settings.cache_max_entries,
+    ttl=settings.cache_ttl_seconds,
+)
+
+
+# Drop a model's entries once the session's transaction commits. Dropped before
+# the commit, a concurrent read could cache the old rows again until the TTL
+def invalidate_on_commit(db: Session | AsyncSession, model: Any) -> None:
+    if not read_cache.enabled:
+        return
+
+    session = db.sync_session if isinstance(db, AsyncSession) else db
+    session.info.setdefault(PENDING_INVALIDATIONS_KEY, set()).add(model)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_models(session: Session) -> None:
+    for model in session.info.pop(PENDING_INVALIDATIONS_KEY, ()):
+        read_cache.invalidate(model)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending_invalidations(session: Session) -> None:
+    # nothing changed, the cached rows are still current
+    session.info.pop(PENDING_INVALIDATIONS_KEY, None)
+
+
+def load_options_key(load_options: list[Any]) -> tuple[str, ...]:
+    # the loaded paths decide which relationships a cached entry carries
+    paths: list[str] = []
+    for option in load_options:
+        context = getattr(option, "context", None)
+        if context is None:
+            paths.append(repr(option))
+            continue
+        paths.extend(str(element.path) for element in context)
+
+    return tuple(sorted(paths))
+
+
+def snapshot(db_model: Any, depth: int = 1) -> Any:
+    """
+    Detached copy of the loaded columns, and of relationships that were
+    already loaded, so a cached object never shares state with a session.
+    """
+    state = inspect(db_model)
+    mapper = state.mapper
+
+    values = {
+        attribute.key: state.dict[attribute.key]
+        for attribute in mapper.column_attrs
+        if attribute.key in state.dict
+    }
+
+    if depth:
+        for relationship in mapper.relationships:
+            if relationship.key not in state.dict:
+                continue
+
+            related = state.dict[relationship.key]
+            if related is None:
+                values[relationship.key] = None
+            elif relationship.uselist:
+                values[relationship.key] = [snapshot(item, depth - 1) for item in related]
+            else:
+                values[relationship.key] = snapshot(related, depth - 1)
+
+    copy = mapper.class_(**values)
+    make_transient_to_detached(copy)
+    return copy
+
+
+def snapshot_tags(db_model: Any) -> set[str]:
+    state = inspect(db_model)
+    tags = {state.mapper.local_table.name}
+
+    for relationship in state.mapper.relationships:
+        if relationship.key in state.dict:
+            tags.add(relationship.mapper.local_table.name)
+
+    return tags
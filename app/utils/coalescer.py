@@ -0,0 +1,110 @@
+import asyncio
+import copy
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class Coalescer:
+    """
+    Groups the items submitted under the same key within a short window and
+    hands each group to a single flush call. flush returns one result per
+    item, in order; an exception in that list is raised to that caller only.
+    Results whose caller was cancelled while the group flushed are handed to
+    release, so whatever flush reserved for them is given back.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[Any, list[Any]], Awaitable[list[Any]]],
+        window: float,
+        max_batch: int,
+        release: Callable[[Any, list[Any]], Awaitable[None]] | None = None,
+    ):
+        self.flush = flush
+        self.release = release
+        self.window = window
+        self.max_batch = max_batch
+        self.pending: dict[Hashable, list[tuple[Any, asyncio.Future[Any]]]] = {}
+        self.timers: dict[Hashable, asyncio.TimerHandle] = {}
+        self.tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Any] = loop.create_future()
+
+        group = self.pending.setdefault(key, [])
+        group.append((item, future))
+
+        if len(group) >= self.max_batch:
+            self.__start_flush(key)
+        elif key not in self.timers:
+            self.timers[key] = loop.call_later(self.window, self.__start_flush, key)
+
+        return await future
+
+    def __start_flush(self, key: Hashable) -> None:
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        group = self.pending.pop(key, None)
+        if not group:
+            return
+
+        task = asyncio.get_running_loop().create_task(self.__flush(key, group))
+        # keep a reference until done, the loop only holds weak ones
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def __flush(self, key: Hashable, group: list[tuple[Any, asyncio.Future[Any]]]) -> None:
+        try:
+            results = await self.flush(key, [item for item, _ in group])
+        except Exception as e:
+            results = [e] * len(group)
+
+        abandoned: list[Any] = []
+        for (_, future), result in zip(group, results):
+            # the caller may have gone away while the group was flushing
+            if future.done():
+                if not isinstance(result, BaseException):
+                    abandoned.append(result)
+                continue
+
+            if isinstance(result, BaseException):
+                # every caller raises its own instance, tracebacks are not shared
+                future.set_exception(copy_exception(result))
+            else:
+                future.set_result(result)
+
+        if abandoned and self.release is not None:
+            try:
+                await self.release(key, abandoned)
+            except Exception as e:
+                logger.error("Releasing %s abandoned results for %s failed: %r", len(abandoned), key, e)
+
+    async def drain(self) -> None:
+        for key in list(self.pending):
+            self.__start_flush(key)
+
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+def copy_exception(error: BaseException) -> BaseException:
+    if isinstance(error, HTTPException):
+        return HTTPException(
+            status_code=error.status_code, detail=error.detail, headers=error.headers
+        )
+
+    try:
+        copied = copy.copy(error)
+    except Exception:
+        # exceptions that cannot be rebuilt from their args are shared as they are
+        return error
+
+    copied.__cause__ = error.__cause__
+    return copied
@@ -0,0 +1,40 @@
+import json
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.engine import Dialect
+
+
+# Row count estimate kept by ANALYZE/autovacuum, no table scan involved
+def reltuples_statement(model: Any) -> Any:
+    return text(
+        "SELECT CAST(reltuples AS BIGINT) FROM pg_class "
+        "WHERE oid = CAST(:table_name AS regclass)"
+    ).bindparams(table_name=model.__table__.name)
+
+
+# Ask the planner how many rows a filtered query would return
+def explain_statement(statement: Any, dialect: Dialect) -> Any:
+    compiled = statement.compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True}
+    )
+    return text(f"EXPLAIN (FORMAT JSON) {compiled}")
+
+
+def estimate_from_reltuples(reltuples: Any) -> int | None:
+    # -1 means the table was never analyzed, the caller falls back to an exact count
+    if reltuples is None or reltuples < 0:
+        return None
+
+    return int(reltuples)
+
+
+def estimate_from_plan(plan: Any) -> int | None:
+    # asyncpg hands json back as text, psycopg2 already decodes it
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    try:
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
@@ -1,11 +1,42 @@
+from sqlalchemy import delete as delete_statement
 from sqlalchemy import false, or_
+from sqlalchemy import update as update_statement
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.mixins.commons import DateRange
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql.elements import and_
 from sqlalchemy.sql.functions import func
-from app.utils.enums import ActionStatus
+from app.utils.enums import ActionStatus, CountStrategy
+from app.utils.count_util import (
+    estimate_from_plan,
+    estimate_from_reltuples,
+    explain_statement,
+    reltuples_statement,
+)
+from app.utils.cache_util import (
+    MISSING,
+    invalidate_on_commit,
+    load_options_key,
+    read_cache,
+    snapshot,
+    snapshot_tags,
+)
+from app.utils.statement_cache import (
+    count_statement,
+    lookup_statement,
+    table_of,
+    where_clause,
+    where_shape,
+)
+from app.utils.pagination import (
+    decode_cursor,
+    keyset_condition,
+    keyset_order_by,
+    next_cursor,
+)
 from app.config import database as db
-from typing import Any, Generator
+from contextlib import contextmanager
+from typing import Any, Generator, Iterator
 from pydantic.main import BaseModel
 
 from sqlalchemy.orm import Session
@@ -24,6 +55,39 @@ def get_db() -> Generator[Any, Any, Any]:
 class CrudUtil:
     def __init__(self, db: Session = Depends(get_db)):
         self.db = db
+        self.in_unit_of_work = False
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator["CrudUtil"]:
+        """
+        Runs the CrudUtil calls of the block in one transaction: their
+        autocommit is suspended, only creates flush (to get keys and
+        defaults), and a single commit runs on exit, or a rollback on error.
+        A nested block joins the outer one.
+        """
+        if self.in_unit_of_work:
+            yield self
+            return
+
+        self.in_unit_of_work = True
+        try:
+            yield self
+            self.db.commit()
+
+        except IntegrityError as e:
+            print(e)
+            self.db.rollback()
+            raise HTTPException(
+                status_code=403,
+                detail="Cannot save changes, possible duplicate or invalid attributes",
+            )
+
+        except Exception:
+            self.db.rollback()
+            raise
+
+        finally:
+            self.in_unit_of_work = False
 
     def create_model(
         self, model_to_create: Any, create: BaseModel, autocommit: bool = True
@@ -36,12 +100,13 @@ class CrudUtil:
                 **create.model_dump(exclude=set(create_columns - columns))
             )
 
-            if not autocommit:
+            if not autocommit or self.in_unit_of_work:
                 self.__add_no_commit(db_model)
-                return db_model
             else:
                 self.__add_and_commit(db_model)
-                return db_model
+
+            self.__invalidate(model_to_create, autocommit)
+            return db_model
 
         except IntegrityError as e:
             print(e)
@@ -59,27 +124,34 @@ class CrudUtil:
         order_by_column: str = "id",
         order: str = "asc",
         custom_error: str = "",
+        load_options: list[Any] = [],
     ) -> Any:
+        # only single-row lookups by uuid go through the read cache
+        cache_key = None
+        if read_cache.enabled and list(model_conditions) == ["uuid"] and order == "asc":
+            cache_key = (
+                model_to_get.__table__.name,
+                "detail",
+                model_conditions["uuid"],
+                load_options_key(load_options),
+            )
+            cached = read_cache.get(cache_key)
+            if cached is not MISSING:
+                # attach a copy to this session so callers can still modify it
+                return self.db.merge(cached, load=False)
+
         try:
-            conditions: list[Any] = []
-            for field_name in model_conditions:
-                if model_conditions[field_name] is not None:
-                    conditions.append(
-                        and_(
-                            getattr(model_to_get, field_name)
-                            == model_conditions[field_name]
-                        )
-                    )
+            shape, params = where_shape(model_conditions)
+            statement = lookup_statement(model_to_get, shape, order_by_column, order)
+            if load_options:
+                statement = statement.options(*load_options)
 
-            if order != "asc":
-                return (
-                    self.db.query(model_to_get)
-                    .filter(and_(*conditions))
-                    .order_by(getattr(model_to_get, order_by_column).desc())
-                    .one()
-                )
+            db_model = self.db.execute(statement, params).scalars().one()
 
-            return self.db.query(model_to_get).filter(and_(*conditions)).one()
+            if cache_key is not None:
+                read_cache.set(cache_key, snapshot(db_model), snapshot_tags(db_model))
+
+            return db_model
 
         except AttributeError:
             raise HTTPException(
@@ -107,12 +179,16 @@ class CrudUtil:
         )
 
         try:
-            if not autocommit:
+            if self.in_unit_of_work:
+                # flushed by the commit at the end of the unit of work
+                self.__apply_update(db_model, update)
+            elif not autocommit:
                 self.__update_no_commit(db_model, update)
-                return db_model
             else:
                 self.__update_and_commit(db_model, update)
-                return db_model
+
+            self.__invalidate(model_to_update, autocommit)
+            return db_model
 
         except Exception as e:
             print(e)
@@ -132,7 +208,36 @@ class CrudUtil:
         count_by_column: str = "id",
         join_conditions: dict[Any, Any] = {},
         conjunction: str = "and",
+        cursor: str | None = None,
+        count_strategy: CountStrategy = CountStrategy.exact,
+        load_options: list[Any] = [],
+        columns: list[str] = [],
     ) -> dict[str, Any]:
+        """
+        Passing a cursor (an empty string for the first page) switches from
+        offset paging to keyset paging on (order_by_column, id); the returned
+        next_cursor then fetches the following page and skip is ignored.
+
+        list_conditions and join_conditions keys are column names with an
+        optional operator, e.g. {"price__gte": 10, "status__not_in": [...],
+        "name__prefix": "ab", "deleted_at__is_null": True}; see
+        app.utils.statement_cache for the full list. Unknown columns and
+        operators are answered with a 403 before any SQL runs.
+
+        count_strategy picks how the total is computed: a separate exact
+        count, count(*) OVER () on the page query (keyset pages after the
+        first fall back to the exact count, the window would only cover the
+        rows from the cursor onwards), a planner estimate, or no count at all
+        (count is None).
+
+        load_options are loader options such as selectinload(...) applied to
+        the page query, so relationships the response serializes are fetched
+        up front instead of one lazy load per row.
+
+        columns switches to projection: only these columns (plus id and the
+        order column, which paging needs) are selected and items are plain
+        rows instead of ORM objects, so load_options do not apply.
+        """
         if "limit" in list_conditions:
             limit = list_conditions["limit"]
             del list_conditions["limit"]
@@ -146,64 +251,150 @@ class CrudUtil:
             del list_conditions["order"]
 
         limit = None if limit == 0 else limit
+
+        cache_key = None
+        if read_cache.enabled:
+            cache_key = self.__list_cache_key(
+                model_to_list,
+                list_conditions,
+                date_range,
+                skip,
+                limit,
+                order_by_column,
+                order,
+                count_by_column,
+                join_conditions,
+                conjunction,
+                cursor,
+                count_strategy,
+                load_options,
+                columns,
+            )
+            cached = read_cache.get(cache_key)
+            if cached is not MISSING:
+                return {**cached, "items": list(cached["items"])}
+
         try:
-            conditions: list[Any] = self.__get_conditions(
-                model_to_list, list_conditions, conjunction
+            # the filter tree is built once per shape, the values are bound
+            shape, params = where_shape(list_conditions, join_conditions, date_range)
+            conditions: list[Any] = [where_clause(model_to_list, shape, conjunction)]
+
+            join_models = [join_model for join_model in join_conditions]
+
+            projection = self.__projection(model_to_list, columns, order_by_column)
+            entities = projection or [model_to_list]
+
+            cursor_values = (
+                decode_cursor(model_to_list, order_by_column, cursor)
+                if cursor
+                else None
             )
 
-            conditions.extend(
-                self.__get_join_conditions(model_to_list, join_conditions, conjunction)
+            # past the first keyset page the window only sees the rows after
+            # the cursor, so those pages take the exact count instead
+            window_count = (
+                count_strategy == CountStrategy.exact_window and cursor_values is None
             )
 
-            join_models = [join_model for join_model in join_conditions]
+            try:
+                if window_count:
+                    querier = self.db.query(*entities, func.count().over())
+                else:
+                    querier = self.db.query(*entities)
+                for join_model in join_models:
+                    querier = querier.join(join_model)
+                if not projection:
+                    querier = querier.options(*load_options)
+                querier = querier.params(**params)
 
-            if date_range:
-                conditions.append(
-                    and_(
-                        getattr(model_to_list, date_range.column_name)
-                        >= date_range.from_date
+                if cursor is None:
+                    model_list = self.__make_query(
+                        querier,
+                        model_to_list,
+                        conditions,
+                        order_by_column,
+                        order,
+                        skip,
+                        limit,
+                        conjunction,
                     )
-                )
-                conditions.append(
-                    and_(
-                        getattr(model_to_list, date_range.column_name)
-                        <= date_range.to_date
+                else:
+                    model_list = self.__make_keyset_query(
+                        querier,
+                        model_to_list,
+                        conditions,
+                        order_by_column,
+                        order,
+                        cursor_values,
+                        limit,
+                        conjunction,
                     )
-                )
 
-            try:
-                db_model_count = int(
-                    self.get_model_count(
+                db_model_count: int | None = None
+                if window_count:
+                    rows = model_list
+                    # projected rows keep the trailing count column, schemas ignore it
+                    model_list = rows if projection else [row[0] for row in rows]
+                    if rows:
+                        db_model_count = int(rows[0][-1])
+                    elif not skip:
+                        db_model_count = 0
+
+                elif count_strategy == CountStrategy.estimated:
+                    db_model_count = self.get_model_count_estimate(
                         model_to_list,
-                        count_by_column,
-                        list_conditions,
-                        date_range,
-                        join_conditions=join_conditions,
-                        conjunction=conjunction,
+                        self.__filter_query(querier, conditions, conjunction)
+                        .statement.params(**params),
+                        filtered=bool(params),
                     )
-                )
 
-                querier = self.db.query(model_to_list)
-                for join_model in join_models:
-                    querier = querier.join(join_model)
-
-                model_list = self.__make_query(
-                    querier,
-                    model_to_list,
-                    conditions,
-                    order_by_column,
-                    order,
-                    skip,
-                    limit,
-                    conjunction,
-                )
+                # exact, or the fallback when the cheaper strategies had no answer
+                if db_model_count is None and count_strategy != CountStrategy.none:
+                    db_model_count = int(
+                        self.get_model_count(
+                            model_to_list,
+                            count_by_column,
+                            list_conditions,
+                            date_range,
+                            join_conditions=join_conditions,
+                            conjunction=conjunction,
+                        )
+                    )
 
             except Exception as e:
                 print(e)
                 db_model_count = 0
                 model_list = []
+                cache_key = None
+
+            page = {
+                "items": model_list,
+                "count": db_model_count,
+                "next_cursor": (
+                    next_cursor(model_list, limit, order_by_column)
+                    if cursor is not None
+                    else None
+                ),
+            }
+
+            if cache_key is not None:
+                tags = {model_to_list.__table__.name}
+                tags.update(table_of(join_model).name for join_model in join_models)
+
+                # rows are immutable and safe to share, entities are copied
+                if projection:
+                    items = list(model_list)
+                else:
+                    items = [snapshot(item) for item in model_list]
+                    for item in model_list:
+                        tags.update(snapshot_tags(item))
 
-            return {"items": model_list, "count": db_model_count}
+                read_cache.set(cache_key, {**page, "items": items}, tags)
+
+            return page
+
+        except HTTPException:
+            raise
 
         except AttributeError:
             raise HTTPException(
@@ -229,12 +420,15 @@ class CrudUtil:
             model_conditions=delete_conditions,
         )
         try:
-            if autocommit:
+            if self.in_unit_of_work:
+                self.db.delete(db_model)
+            elif autocommit:
                 self.__delete_and_commit(db_model)
-                return {"status": ActionStatus.success}
             else:
                 self.__delete_no_commit(db_model)
-                return {"status": ActionStatus.success}
+
+            self.__invalidate(model_to_delete, autocommit)
+            return {"status": ActionStatus.success}
 
         except Exception as e:
             print(e)
@@ -245,58 +439,202 @@ class CrudUtil:
             )
 
 
-    def get_model_count(
+    def update_many(
         self,
-        model_to_count: Any,
-        column_to_count_by: str,
-        model_conditions: dict[str, Any] = {},
-        date_range: DateRange | None = None,
-        join_conditions: dict[Any, Any] = {},
+        model_to_update: Any,
+        update: BaseModel | dict[str, Any],
+        update_conditions: dict[str, Any] = {},
         conjunction: str = "and",
-    ) -> int:
+        returning_columns: list[str] = [],
+        autocommit: bool = True,
+    ) -> dict[str, Any]:
+        """
+        One UPDATE ... WHERE over every row matching update_conditions, with
+        the same semantics as list_model (None values are ignored). No ORM
+        objects are loaded; objects already in the session keep their old
+        values. Returns the affected row count, plus the returning_columns
+        of each row as items when asked for.
+        """
         try:
-            conditions: list[Any] = self.__get_conditions(
-                model_to_count, model_conditions, conjunction
+            values = self.__update_values(model_to_update, update)
+            if not values:
+                raise HTTPException(
+                    status_code=403,
+                    detail=f"No valid fields to update on {model_to_update.__qualname__}",
+                )
+
+            statement = (
+                update_statement(model_to_update)
+                .where(self.__required_conditions(
+                    model_to_update, update_conditions, conjunction
+                ))
+                .values(**values)
+                .execution_options(synchronize_session=False)
             )
 
-            conditions.extend(
-                self.__get_join_conditions(model_to_count, join_conditions, conjunction)
+            page = self.__execute_many(
+                model_to_update, statement, returning_columns, autocommit
             )
 
-            join_models = [join_model for join_model in join_conditions]
+            self.__invalidate(model_to_update, autocommit)
+            return page
 
-            if date_range:
-                conditions.append(
-                    and_(
-                        getattr(model_to_count, date_range.column_name)
-                        >= date_range.from_date
-                    )
+        except HTTPException:
+            raise
+
+        except AttributeError:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Invalid attribute for {model_to_update.__qualname__}",
+            )
+
+        except Exception as e:
+            print(e)
+            self.db.rollback()
+            raise HTTPException(
+                status_code=403, detail=f"{model_to_update.__qualname__} update failed"
+            )
+
+    def delete_many(
+        self,
+        model_to_delete: Any,
+        delete_conditions: dict[str, Any] = {},
+        conjunction: str = "and",
+        returning_columns: list[str] = [],
+        autocommit: bool = True,
+    ) -> dict[str, Any]:
+        """
+        One DELETE ... WHERE over every row matching delete_conditions.
+        Returns the deleted row count, plus the returning_columns of each
+        deleted row as items when asked for.
+        """
+        try:
+            statement = (
+                delete_statement(model_to_delete)
+                .where(self.__required_conditions(
+                    model_to_delete, delete_conditions, conjunction
+                ))
+                .execution_options(synchronize_session=False)
+            )
+
+            page = self.__execute_many(
+                model_to_delete, statement, returning_columns, autocommit
+            )
+
+            self.__invalidate(model_to_delete, autocommit)
+            return page
+
+        except HTTPException:
+            raise
+
+        except AttributeError:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Invalid attribute for {model_to_delete.__qualname__}",
+            )
+
+        except Exception as e:
+            print(e)
+            self.db.rollback()
+            raise HTTPException(
+                status_code=403,
+                detail=f"Cannot delete these {model_to_delete.__qualname__} rows, "
+                + "check if they're still in use",
+            )
+
+    def upsert_many(
+        self,
+        model_to_upsert: Any,
+        rows: list[BaseModel | dict[str, Any]],
+        conflict_columns: list[str],
+        update_columns: list[str] | None = None,
+        returning_columns: list[str] = ["uuid"],
+        autocommit: bool = True,
+    ) -> dict[str, Any]:
+        """
+        One INSERT ... ON CONFLICT (conflict_columns) DO UPDATE ... RETURNING.
+        conflict_columns must match a unique index. update_columns defaults
+        to every supplied column except the conflict columns; an empty list
+        turns the statement into ON CONFLICT DO NOTHING, whose skipped rows
+        are not returned.
+        """
+        if not rows:
+            return {"count": 0, "items": []}
+
+        try:
+            values = [self.__create_values(model_to_upsert, row) for row in rows]
+
+            if update_columns is None:
+                supplied = {column for row in values for column in row}
+                update_columns = sorted(
+                    supplied - set(conflict_columns) - {"id", "uuid", "created_at"}
                 )
 
-                conditions.append(
-                    and_(
-                        getattr(model_to_count, date_range.column_name)
-                        <= date_range.to_date
-                    )
+            statement = pg_insert(model_to_upsert).values(values)
+            conflict_targets = [getattr(model_to_upsert, column) for column in conflict_columns]
+
+            if update_columns:
+                set_: dict[str, Any] = {
+                    column: statement.excluded[column] for column in update_columns
+                }
+                # onupdate defaults do not fire for ON CONFLICT DO UPDATE
+                if "last_modified" in model_to_upsert.__table__.c:
+                    set_["last_modified"] = func.now()
+
+                statement = statement.on_conflict_do_update(
+                    index_elements=conflict_targets, set_=set_
                 )
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=conflict_targets)
 
-            querier = self.db.query(
-                func.count(getattr(model_to_count, column_to_count_by))
+            page = self.__execute_many(
+                model_to_upsert, statement, returning_columns, autocommit
             )
 
-            for join_model in join_models:
-                querier = querier.join(join_model)
+            self.__invalidate(model_to_upsert, autocommit)
+            return page
 
-            if conditions:
-                if conjunction == "or":
-                    db_count = querier.filter(or_(false(), *conditions)).one()
-                else:
-                    db_count = querier.filter(and_(*conditions)).one()
+        except HTTPException:
+            raise
 
-            else:
-                db_count = querier.one()
+        except AttributeError:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Invalid attribute for {model_to_upsert.__qualname__}",
+            )
 
-            db_count = db_count[0]
+        except IntegrityError as e:
+            print(e)
+            self.db.rollback()
+            raise HTTPException(
+                status_code=403,
+                detail=f"Cannot upsert {model_to_upsert.__qualname__}, \
+                    possible duplicate or invalid attributes",
+            )
+
+        except Exception as e:
+            # e.g. conflict columns without a unique index, the transaction is aborted
+            print(e)
+            self.db.rollback()
+            raise HTTPException(
+                status_code=403, detail=f"{model_to_upsert.__qualname__} upsert failed"
+            )
+
+    def get_model_count(
+        self,
+        model_to_count: Any,
+        column_to_count_by: str,
+        model_conditions: dict[str, Any] = {},
+        date_range: DateRange | None = None,
+        join_conditions: dict[Any, Any] = {},
+        conjunction: str = "and",
+    ) -> int:
+        try:
+            shape, params = where_shape(model_conditions, join_conditions, date_range)
+            db_count = self.db.execute(
+                count_statement(model_to_count, column_to_count_by, shape, conjunction),
+                params,
+            ).scalar_one()
 
             if not db_count:
                 return 0
@@ -317,6 +655,94 @@ class CrudUtil:
                     Record not found",
             )
 
+    def get_model_count_estimate(
+        self,
+        model_to_count: Any,
+        statement: Any = None,
+        filtered: bool = False,
+    ) -> int | None:
+        """
+        Approximate row count from planner statistics: pg_class.reltuples for
+        the whole table, EXPLAIN of the statement when it is filtered.
+        Returns None when no estimate is available.
+        """
+        try:
+            if not filtered:
+                reltuples = self.db.execute(reltuples_statement(model_to_count)).scalar()
+                return estimate_from_reltuples(reltuples)
+
+            plan = self.db.execute(
+                explain_statement(statement, self.db.get_bind().dialect)
+            ).scalar()
+            return estimate_from_plan(plan)
+
+        except Exception as e:
+            print(e)
+            return None
+
+    def __filter_query(
+        self, query: Any, conditions: list[Any], conjunction: str
+    ) -> Any:
+        if conjunction == "or":
+            return query.filter(or_(false(), *conditions))
+
+        return query.filter(and_(*conditions))
+
+    def __list_cache_key(
+        self,
+        model: Any,
+        list_conditions: dict[str, Any],
+        date_range: DateRange | None,
+        skip: int,
+        limit: int | None,
+        order_by_column: str,
+        order: str,
+        count_by_column: str,
+        join_conditions: dict[Any, Any],
+        conjunction: str,
+        cursor: str | None,
+        count_strategy: CountStrategy,
+        load_options: list[Any],
+        columns: list[str],
+    ) -> tuple[Any, ...]:
+        return (
+            model.__table__.name,
+            "list",
+            tuple(sorted((key, repr(value)) for key, value in list_conditions.items())),
+            date_range.model_dump_json() if date_range else None,
+            skip,
+            limit,
+            order_by_column,
+            order,
+            count_by_column,
+            tuple(
+                (repr(join_model), tuple(sorted(
+                    (key, repr(value)) for key, value in join_conditions[join_model].items()
+                )))
+                for join_model in join_conditions
+            ),
+            conjunction,
+            cursor,
+            count_strategy.value,
+            load_options_key(load_options),
+            tuple(columns),
+        )
+
+    def __projection(
+        self, model: Any, columns: list[str], order_by_column: str
+    ) -> list[Any]:
+        if not columns:
+            return []
+
+        projection: list[Any] = []
+        for column_name in dict.fromkeys(["id", order_by_column, *columns]):
+            # relationships and unknown names are rejected like other bad attributes
+            if column_name not in model.__table__.c:
+                raise AttributeError(column_name)
+            projection.append(getattr(model, column_name))
+
+        return projection
+
     def __add_and_commit(self, model_to_add: Any) -> None:
         # check if model to add is a list
         if isinstance(model_to_add, list):
@@ -335,20 +761,27 @@ class CrudUtil:
         self.db.flush()
 
     def __update_and_commit(self, model_to_update: Any, update: BaseModel) -> None:
-        update_dict = self.__remove_invalid_fields(model_to_update, update)
-        for key, value in update_dict.items():
-            setattr(model_to_update, key, value)
+        self.__apply_update(model_to_update, update)
 
         self.db.commit()
-        self.db.refresh(model_to_update)
 
     def __update_no_commit(self, model_to_update: Any, update: BaseModel) -> None:
+        self.__apply_update(model_to_update, update)
+
+        self.db.flush()
+
+    def __apply_update(self, model_to_update: Any, update: BaseModel) -> None:
         update_dict = self.__remove_invalid_fields(model_to_update, update)
 
         for key, value in update_dict.items():
             setattr(model_to_update, key, value)
 
-        self.db.flush()
+    def __invalidate(self, model: Any, autocommit: bool) -> None:
+        if autocommit and not self.in_unit_of_work:
+            read_cache.invalidate(model)
+        else:
+            # whoever commits the change also drops the cached rows
+            invalidate_on_commit(self.db, model)
 
     def __delete_and_commit(self, model_to_delete: Any) -> None:
         self.db.delete(model_to_delete)
@@ -358,6 +791,67 @@ class CrudUtil:
         self.db.delete(model_to_delete)
         self.db.flush()
 
+    def __required_conditions(
+        self, model: Any, model_conditions: dict[str, Any], conjunction: str
+    ) -> Any:
+        conditions = self.__get_conditions(model, model_conditions, conjunction)
+
+        # no condition would silently hit the whole table
+        if not conditions:
+            raise HTTPException(
+                status_code=403,
+                detail=f"Conditions are required to change many {model.__qualname__} rows",
+            )
+
+        if conjunction == "or":
+            return or_(false(), *conditions)
+
+        return and_(*conditions)
+
+    def __execute_many(
+        self,
+        model: Any,
+        statement: Any,
+        returning_columns: list[str],
+        autocommit: bool,
+    ) -> dict[str, Any]:
+        if returning_columns:
+            statement = statement.returning(
+                *[getattr(model, column) for column in returning_columns]
+            )
+
+        result = self.db.execute(statement)
+
+        if returning_columns:
+            items = [dict(row) for row in result.mappings().all()]
+            count = len(items)
+        else:
+            items = []
+            count = result.rowcount
+
+        if autocommit and not self.in_unit_of_work:
+            self.db.commit()
+
+        return {"count": count, "items": items}
+
+    def __update_values(
+        self, model: Any, data: BaseModel | dict[str, Any]
+    ) -> dict[str, Any]:
+        if isinstance(data, BaseModel):
+            return self.__remove_invalid_fields(model, data)
+
+        columns: set[str] = set(model.__table__.c.keys())
+        return {key: value for key, value in data.items() if key in columns}
+
+    def __create_values(
+        self, model: Any, data: BaseModel | dict[str, Any]
+    ) -> dict[str, Any]:
+        if isinstance(data, BaseModel):
+            data = data.model_dump()
+
+        columns: set[str] = set(model.__table__.c.keys())
+        return {key: value for key, value in data.items() if key in columns}
+
     def __remove_invalid_fields(self, model: Any, data: BaseModel) -> dict[str, Any]:
         columns: set[str] = set(model.__table__.c.keys())
         data_fields: set[str] = set(data.model_dump(exclude_unset=True).keys())
@@ -375,43 +869,39 @@ class CrudUtil:
         list_conditions: dict[str, Any],
         conjunction: str = "and",
     ) -> list[Any]:
-        conditions: list[Any] = []
-        for field_name in list_conditions:
-            if list_conditions[field_name] is not None:
-                if conjunction == "or":
-                    conditions.append(
-                        getattr(model, field_name) == list_conditions[field_name]
-                    )
-                else:
-                    conditions.append(
-                        and_(getattr(model, field_name) == list_conditions[field_name])
-                    )
-        return conditions
+        # the same operator keys as the cached filters, with the values bound in place
+        shape, params = where_shape(list_conditions)
+        if not shape[0]:
+            return []
 
-    def __get_join_conditions(
+        return [where_clause(model, shape, conjunction).params(**params)]
+
+    def __make_keyset_query(
         self,
+        query: Any,
         model: Any,
-        join_conditions: dict[Any, Any],
-        conjunction: str = "and",
-    ) -> list[Any]:
-        join_models = [join_model for join_model in join_conditions]
-        conditions: list[Any] = []
-        for join_model in join_models:
-            for field_name in join_conditions[join_model]:
-                if join_conditions[join_model][field_name] is not None:
-                    if conjunction == "or":
-                        conditions.append(
-                            getattr(join_model, field_name)
-                            == join_conditions[join_model][field_name]
-                        )
-                    else:
-                        conditions.append(
-                            and_(
-                                getattr(join_model, field_name)
-                                == join_conditions[join_model][field_name]
-                            )
-                        )
-        return conditions
+        conditions: list[Any],
+        order_by_column: str,
+        order: str,
+        cursor_values: tuple[Any, int] | None,
+        limit: int | None,
+        conjunction: str,
+    ) -> Any:
+        if conjunction == "or":
+            query = query.filter(or_(false(), *conditions))
+        else:
+            query = query.filter(and_(*conditions))
+
+        if cursor_values is not None:
+            query = query.filter(
+                keyset_condition(model, order_by_column, order, cursor_values)
+            )
+
+        return (
+            query.order_by(*keyset_order_by(model, order_by_column, order))
+            .limit(limit)
+            .all()
+        )
 
     def __make_query(
         self,
@@ -424,30 +914,11 @@ class CrudUtil:
         limit: int | None,
         conjunction: str,
     ) -> Any:
-        if order != "asc":
-            if conjunction == "or":
-                return (
-                    query.filter(or_(false(), *conditions))
-                    .order_by(getattr(model, order_by_column).desc())
-                    .offset(skip)
-                    .limit(limit)
-                    .all()
-                )
-            else:
-                return (
-                    query.filter(and_(*conditions))
-                    .order_by(getattr(model, order_by_column).desc())
-                    .offset(skip)
-                    .limit(limit)
-                    .all()
-                )
-        if conjunction == "or":
-            return (
-                query.filter(or_(false(), *conditions))
-                .order_by(getattr(model, order_by_column))
-                .offset(skip)
-                .limit(limit)
-                .all()
-            )
-        else:
-            return query.filter(and_(*conditions)).offset(skip).limit(limit).all()
+        # id breaks ties, so rows sharing a sort value never hop between pages
+        return (
+            self.__filter_query(query, conditions, conjunction)
+            .order_by(*keyset_order_by(model, order_by_column, order))
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
@@ -2,4 +2,29 @@ from enum import Enum
 
 class ActionStatus(str, Enum):
     success = "success"
-    failed = "failed"
\ No newline at end of file
+    failed = "failed"
+
+class CountStrategy(str, Enum):
+    # separate SELECT count(...) query
+    exact = "exact"
+    # count(*) OVER () on the page query itself
+    exact_window = "exact_window"
+    # planner statistics, cheap but approximate
+    estimated = "estimated"
+    none = "none"
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+
+class ProductSort(str, Enum):
+    id = "id"
+    price = "price"
+    created_at = "created_at"
@@ -0,0 +1,74 @@
+import csv
+import io
+import os
+from typing import Any, BinaryIO, Iterator
+
+from fastapi import HTTPException
+from openpyxl import load_workbook
+from sqlalchemy import Table
+from sqlalchemy.orm import Session
+
+
+# Stream an uploaded CSV/XLSX sheet as chunks of (row number, row) pairs.
+# Row numbers count the header as row 1, like a spreadsheet does.
+def read_import_chunks(
+    file: BinaryIO, filename: str | None, chunk_size: int
+) -> Iterator[list[tuple[int, dict[str, Any]]]]:
+    extension = os.path.splitext(filename or "")[1].lower()
+
+    if extension == ".csv":
+        rows = read_csv_rows(file)
+    elif extension in (".xlsx", ".xlsm"):
+        rows = read_xlsx_rows(file)
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported file type, expected .csv or .xlsx")
+
+    chunk: list[tuple[int, dict[str, Any]]] = []
+    for row_number, row in rows:
+        # blank cells are missing values, not empty strings
+        row = {key: value for key, value in row.items() if key and value not in ("", None)}
+        if not row:
+            continue
+
+        chunk.append((row_number, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def read_csv_rows(file: BinaryIO) -> Iterator[tuple[int, dict[str, Any]]]:
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    yield from enumerate(reader, start=2)
+
+
+def read_xlsx_rows(file: BinaryIO) -> Iterator[tuple[int, dict[str, Any]]]:
+    # read_only keeps memory flat on large sheets
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        # unnamed columns get an empty name and are dropped with the blank cells
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+
+        for row_number, values in enumerate(rows, start=2):
+            yield row_number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+# COPY rows into a table on the session's connection, inside its transaction
+def copy_rows(db: Session, table: Table, columns: list[str], rows: list[tuple[Any, ...]]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
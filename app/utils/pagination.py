@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import literal, tuple_
+
+
+# Cursors are opaque to clients: base64 of the (order column, id) pair of the last row
+def encode_cursor(item: Any, order_by_column: str) -> str:
+    value = getattr(item, order_by_column)
+
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    elif isinstance(value, Enum):
+        value = value.name
+
+    payload = json.dumps([value, item.id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(model: Any, order_by_column: str, cursor: str) -> tuple[Any, int]:
+    try:
+        value, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        python_type = getattr(model, order_by_column).type.python_type
+
+        if value is not None:
+            if issubclass(python_type, datetime):
+                value = datetime.fromisoformat(value)
+            elif issubclass(python_type, date):
+                value = date.fromisoformat(value)
+            elif issubclass(python_type, Enum):
+                value = python_type[value]
+
+        return value, int(item_id)
+
+    except (ValueError, TypeError, KeyError, binascii.Error, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# Rows strictly after the cursor in (order column, id) order
+def keyset_condition(
+    model: Any, order_by_column: str, order: str, cursor_values: tuple[Any, int]
+) -> Any:
+    value, item_id = cursor_values
+
+    keys: Any
+    bound: Any
+    if order_by_column == "id":
+        keys, bound = model.id, item_id
+    else:
+        column = getattr(model, order_by_column)
+        keys = tuple_(column, model.id)
+        bound = tuple_(literal(value, column.type), literal(item_id, model.id.type))
+
+    if order != "asc":
+        return keys < bound
+
+    return keys > bound
+
+
+def keyset_order_by(model: Any, order_by_column: str, order: str) -> list[Any]:
+    columns = [getattr(model, order_by_column)]
+    if order_by_column != "id":
+        columns.append(model.id)
+
+    if order != "asc":
+        return [column.desc() for column in columns]
+
+    return columns
+
+
+def next_cursor(items: list[Any], limit: int | None, order_by_column: str) -> str | None:
+    # a short page means there is nothing left to read
+    if not items or limit is None or len(items) < limit:
+        return None
+
+    return encode_cursor(items[-1], order_by_column)
@@ -0,0 +1,85 @@
+from functools import lru_cache
+from types import GenericAlias
+from typing import Any, TypeVar, get_args
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+ListSchema = TypeVar("ListSchema", bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def type_adapter(schema: Any) -> TypeAdapter[Any]:
+    # building an adapter compiles the schema, do it once per type
+    return TypeAdapter(schema)
+
+
+def json_response(
+    schema: Any,
+    content: Any,
+    status_code: int = 200,
+    headers: dict[str, str] | None = None,
+    validated: bool = False,
+) -> Response:
+    """
+    Serialize content as schema straight to JSON bytes in pydantic-core.
+    ORM objects and dicts are validated once; pass validated=True when the
+    caller already built the content as schema, e.g. a list of schema
+    instances, which a type check alone cannot recognise. Returning the
+    Response skips FastAPI's own response model validation and
+    jsonable_encoder pass.
+    """
+    adapter = type_adapter(schema)
+
+    if not validated:
+        content = adapter.validate_python(content, from_attributes=True)
+
+    return Response(
+        content=adapter.dump_json(content),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+# Parse ?fields=a,b against a schema, None when the client wants every field
+def select_fields(schema: type[BaseModel], fields: str | None) -> tuple[str, ...] | None:
+    names = tuple(dict.fromkeys(
+        name.strip() for name in (fields or "").split(",") if name.strip()
+    ))
+    if not names:
+        return None
+
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Invalid fields for {schema.__name__}: {', '.join(unknown)}",
+        )
+
+    return names
+
+
+@lru_cache(maxsize=256)
+def sparse_list_schema(list_schema: type[ListSchema], fields: tuple[str, ...]) -> type[ListSchema]:
+    """
+    Subclass of a list schema whose items only carry the given fields of the
+    item schema, so a trimmed page still validates and serializes.
+    """
+    item_schema: type[BaseModel] = get_args(list_schema.model_fields["items"].annotation)[0]
+
+    field_definitions: dict[str, Any] = {
+        name: (item_schema.model_fields[name].annotation, item_schema.model_fields[name])
+        for name in fields
+    }
+    sparse_item: type[BaseModel] = create_model(
+        f"{item_schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **field_definitions,
+    )
+
+    return create_model(
+        f"{list_schema.__name__}Fields",
+        __base__=list_schema,
+        items=(GenericAlias(list, (sparse_item,)), ...),
+    )
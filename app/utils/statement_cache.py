@@ -0,0 +1,215 @@
+from functools import lru_cache
+from typing import Any, Callable
+
+from sqlalchemy import (
+    BindParameter,
+    ColumnElement,
+    Select,
+    String,
+    Table,
+    and_,
+    bindparam,
+    false,
+    func,
+    not_,
+    or_,
+    select,
+    true,
+)
+
+from app.config.config import settings
+from app.mixins.commons import DateRange
+
+
+# CrudUtil filters come in few shapes (model, filtered columns, joins, date
+# column, conjunction). The expression tree of each shape is built once with
+# bound parameters and reused; SQLAlchemy then finds its compiled SQL in the
+# engine's compiled cache instead of compiling it again.
+#
+# A condition key is a column name, optionally followed by an operator:
+#   "status"               status = value
+#   "status__in"           status IN (values), value is a list
+#   "price__gte"           price >= value, likewise gt, lte and lt
+#   "name__prefix"         case-insensitive prefix, lower(name) LIKE 'abc%'
+#   "deleted_at__is_null"  IS NULL for True, IS NOT NULL for False
+# "not_" in front of an operator negates it ("status__not_in"), and a bare
+# "__not" means not equal. A None value drops the condition, as it always has.
+
+# operator -> predicate on (column, bound parameter); is_null binds nothing
+OPERATORS: dict[str, Callable[[ColumnElement[Any], Any], ColumnElement[bool]]] = {
+    "eq": lambda column, parameter: column == parameter,
+    "in": lambda column, parameter: column.in_(parameter),
+    "gt": lambda column, parameter: column > parameter,
+    "gte": lambda column, parameter: column >= parameter,
+    "lt": lambda column, parameter: column < parameter,
+    "lte": lambda column, parameter: column <= parameter,
+    # matches a lower(column) text_pattern_ops index
+    "prefix": lambda column, parameter: (
+        func.lower(column, type_=String).like(parameter, escape="\\")
+    ),
+    "is_null": lambda column, _: column.is_(None),
+}
+
+
+def table_of(entity: Any) -> Table:
+    # join targets are mapped classes or plain association tables
+    table: Table = getattr(entity, "__table__", entity)
+    return table
+
+
+def column_of(entity: Any, column_name: str) -> Any:
+    # only real columns, relationships and other attributes never reach the SQL
+    table = table_of(entity)
+    if column_name not in table.c:
+        raise AttributeError(column_name)
+
+    if isinstance(entity, Table):
+        return table.c[column_name]
+
+    return getattr(entity, column_name)
+
+
+def split_condition(key: str) -> tuple[str, str, bool]:
+    column_name, _, operator = key.partition("__")
+
+    negated = False
+    if operator == "not":
+        operator, negated = "eq", True
+    elif operator.startswith("not_"):
+        operator, negated = operator[len("not_"):], True
+
+    operator = operator or "eq"
+    if operator not in OPERATORS:
+        raise AttributeError(f"Unknown operator {operator}")
+
+    return column_name, operator, negated
+
+
+def condition_value(operator: str, value: Any) -> Any:
+    if operator == "in":
+        return list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+
+    if operator == "prefix":
+        # the pattern is bound whole, so a constant 'abc%' reaches the planner
+        escaped = str(value).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"{escaped.lower()}%"
+
+    return value
+
+
+def compare(
+    column: ColumnElement[Any], operator: str, parameter_name: str
+) -> ColumnElement[bool]:
+    # one statement for any list length, IN values are expanded at execution
+    parameter: BindParameter[Any] = bindparam(parameter_name, expanding=operator == "in")
+    return OPERATORS[operator](column, parameter)
+
+
+def shape_conditions(
+    conditions: dict[str, Any], prefix: str, params: dict[str, Any]
+) -> tuple[tuple[str, str, bool], ...]:
+    shape: list[tuple[str, str, bool]] = []
+    for key, value in conditions.items():
+        if value is None:
+            continue
+
+        column_name, operator, negated = split_condition(key)
+
+        if operator == "is_null":
+            # IS NULL and IS NOT NULL are two statements, not one bound value
+            shape.append((column_name, operator, negated != (not value)))
+            continue
+
+        params[f"{prefix}{len(shape)}"] = condition_value(operator, value)
+        shape.append((column_name, operator, negated))
+
+    return tuple(shape)
+
+
+def where_shape(
+    model_conditions: dict[str, Any],
+    join_conditions: dict[Any, Any] = {},
+    date_range: DateRange | None = None,
+) -> tuple[tuple[Any, ...], dict[str, Any]]:
+    """
+    Splits CrudUtil filter arguments into a hashable shape and the values to
+    bind. Unknown operators raise AttributeError here, unknown columns when
+    the shape is turned into a clause, so callers answer both with a 403.
+    """
+    params: dict[str, Any] = {}
+
+    columns = shape_conditions(model_conditions, "w", params)
+
+    join_columns = tuple(
+        (join_model, shape_conditions(join_conditions[join_model], f"j{index}_", params))
+        for index, join_model in enumerate(join_conditions)
+    )
+
+    date_column = None
+    if date_range:
+        date_column = date_range.column_name
+        params["date_from"] = date_range.from_date
+        params["date_to"] = date_range.to_date
+
+    return (columns, join_columns, date_column), params
+
+
+def shape_clauses(
+    entity: Any, shape: tuple[tuple[str, str, bool], ...], prefix: str
+) -> list[Any]:
+    clauses: list[Any] = []
+    for index, (column_name, operator, negated) in enumerate(shape):
+        clause = compare(column_of(entity, column_name), operator, f"{prefix}{index}")
+        clauses.append(not_(clause) if negated else clause)
+
+    return clauses
+
+
+@lru_cache(maxsize=settings.statement_cache_size)
+def where_clause(
+    model: Any, shape: tuple[Any, ...], conjunction: str = "and"
+) -> ColumnElement[bool]:
+    columns, join_columns, date_column = shape
+
+    conditions = shape_clauses(model, columns, "w")
+
+    for index, (join_model, join_shape) in enumerate(join_columns):
+        conditions.extend(shape_clauses(join_model, join_shape, f"j{index}_"))
+
+    if date_column:
+        column = column_of(model, date_column)
+        conditions.append(column >= bindparam("date_from"))
+        conditions.append(column <= bindparam("date_to"))
+
+    # no conditions means no filter, whichever the conjunction
+    if not conditions:
+        return true()
+
+    if conjunction == "or":
+        return or_(false(), *conditions)
+
+    return and_(true(), *conditions)
+
+
+@lru_cache(maxsize=settings.statement_cache_size)
+def lookup_statement(
+    model: Any, shape: tuple[Any, ...], order_by_column: str, order: str
+) -> Select[Any]:
+    statement = select(model).where(where_clause(model, shape))
+
+    if order != "asc":
+        statement = statement.order_by(getattr(model, order_by_column).desc())
+
+    return statement
+
+
+@lru_cache(maxsize=settings.statement_cache_size)
+def count_statement(
+    model: Any, column_to_count_by: str, shape: tuple[Any, ...], conjunction: str
+) -> Select[Any]:
+    statement = select(func.count(getattr(model, column_to_count_by)))
+
+    for join_model, _ in shape[1]:
+        statement = statement.join(join_model)
+
+    return statement.where(where_clause(model, shape, conjunction))